@@ -15,7 +15,9 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import csv
 import io
+import warnings
 
 # Try to import PIL for TIFF export
 try:
@@ -24,14 +26,14 @@ try:
 except ImportError:
     PIL_AVAILABLE = False
 
-# Import from local package
-import sys
-sys.path.insert(0, '.')
+# Import from the installed package (pip install -e . during dev)
 from spectrum_annotator_ddzby import (
     FragmentCalculator,
     MONOSACCHARIDE_MASSES,
     O_GLYCAN_COMPOSITIONS,
     N_GLYCAN_COMPOSITIONS,
+    O_GLYCAN_NAMES,
+    N_GLYCAN_NAMES,
     OXONIUM_IONS_EXTENDED,
     CROSSLINKERS,
     generate_crosslink_fragments,
@@ -60,9 +62,204 @@ IPSA_COLORS = {
     'unassigned': '#a6a6a6',
 }
 
+# Oxonium ion library as parallel arrays for vectorized matching.
+# A sorted copy (plus the permutation back to dict order) lets the
+# matcher binary-search instead of broadcasting peaks x ions.
+OXONIUM_NAMES = tuple(OXONIUM_IONS_EXTENDED.keys())
+OXONIUM_MZ = np.fromiter(OXONIUM_IONS_EXTENDED.values(), dtype=np.float64)
+OXONIUM_ORDER = np.argsort(OXONIUM_MZ)
+OXONIUM_MZ_SORTED = OXONIUM_MZ[OXONIUM_ORDER]
+
+# Widget option lists; the glycan name tuples are frozen in
+# glycan_library at import, crosslinkers hoisted here the same way
+CROSSLINKER_KEYS = tuple(CROSSLINKERS.keys())
+
+# Display strings for the library tabs, formatted once at import
+O_GLYCAN_COMP_STRINGS = tuple(
+    ', '.join(f"{k}({v})" for k, v in g.composition.items())
+    for g in O_GLYCAN_COMPOSITIONS.values()
+)
+N_GLYCAN_COMP_STRINGS = tuple(
+    ', '.join(f"{k}({v})" for k, v in g.composition.items())
+    for g in N_GLYCAN_COMPOSITIONS.values()
+)
+
+# Sugars offered by the Glycan Mass Calculator, with their masses as a
+# constant vector so the calculator is a single dot product
+_CALC_KEYS = ('HexNAc', 'Hex', 'Fuc', 'NeuAc', 'NeuGc', 'Sulfate')
+_CALC_MASSES = np.array([MONOSACCHARIDE_MASSES[k] for k in _CALC_KEYS], dtype=np.float64)
+
+# Static spectrum-figure layout (light theme), applied in one
+# update_layout pass together with the batched annotations
+BASE_LAYOUT = dict(
+    plot_bgcolor='white',
+    paper_bgcolor='white',
+    showlegend=False,
+    height=600,
+    margin=dict(t=100, b=50),
+    font=dict(color='black'),
+)
+
+
+def match_oxonium(mz, tolerance, is_ppm):
+    """Match each peak against the oxonium library via binary search.
+
+    Each peak is bisected into the sorted ion m/z array and compared with
+    its nearest neighbour only, so the work is O(peaks log ions) with
+    O(peaks + ions) memory rather than a full peaks x ions broadcast.
+
+    Returns (indices, errors): for every peak, the index of the nearest
+    matching ion in OXONIUM_NAMES order (-1 if none) and the signed ppm
+    error against it.
+    """
+    mz = np.asarray(mz, dtype=np.float64)
+    pos = np.searchsorted(OXONIUM_MZ_SORTED, mz)
+    left = np.clip(pos - 1, 0, OXONIUM_MZ_SORTED.size - 1)
+    right = np.clip(pos, 0, OXONIUM_MZ_SORTED.size - 1)
+    nearest = np.where(
+        np.abs(mz - OXONIUM_MZ_SORTED[right]) < np.abs(mz - OXONIUM_MZ_SORTED[left]),
+        right, left,
+    )
+    ion_mz = OXONIUM_MZ_SORTED[nearest]
+    delta = mz - ion_mz
+    err_ppm = delta / ion_mz * 1e6
+    if is_ppm:
+        mask = np.abs(err_ppm) < tolerance
+    else:
+        mask = np.abs(delta) < tolerance
+
+    indices = np.where(mask, OXONIUM_ORDER[nearest], -1)
+    return indices, err_ppm
+
+
+@st.cache_data(max_entries=32, ttl="15m")
+def annotate_oxonium(mz_bytes, tolerance, tolerance_unit):
+    """Cached oxonium matching keyed on the raw spectrum bytes.
+
+    Repeat annotations of the same peak list with the same tolerance
+    return instantly instead of re-running the matching kernel.
+    """
+    mz = np.frombuffer(mz_bytes, dtype=np.float64)
+    return match_oxonium(mz, tolerance, is_ppm=(tolerance_unit == "ppm"))
+
+
+def peak_segments(mz, heights):
+    """Build NaN-separated x/y arrays that draw one vertical line per peak.
+
+    Lets the whole peak list render as a single Plotly trace instead of
+    one trace object per peak.
+    """
+    # m/z keeps full float64 precision; relative intensity only drives
+    # pixel heights, so float32 halves the serialized payload
+    mz = np.asarray(mz, dtype=np.float64)
+    heights = np.asarray(heights, dtype=np.float32)
+    xs = np.empty(3 * mz.size)
+    ys = np.empty(3 * mz.size, dtype=np.float32)
+    xs[0::3] = mz
+    xs[1::3] = mz
+    xs[2::3] = np.nan
+    ys[0::3] = 0.0
+    ys[1::3] = heights
+    ys[2::3] = np.nan
+    return xs, ys
+
+@st.cache_resource
+def get_fragment_calculator(peptide, modifications_key, precursor_charge,
+                            max_fragment_charge=2):
+    """Share FragmentCalculator instances across reruns and sessions.
+
+    modifications_key is a hashable tuple of (position, residue, mass)
+    entries so identical inputs map to the same cached calculator.
+    """
+    modifications = [
+        {'position': pos, 'residue': res, 'mass': mass}
+        for pos, res, mass in modifications_key
+    ]
+    return FragmentCalculator(peptide, modifications, precursor_charge,
+                              max_fragment_charge=max_fragment_charge)
+
+
+@st.cache_data
+def _build_glycan_df(which):
+    """Build the O- or N-glycan library table once per process."""
+    if which == "O":
+        compositions, names, comps = O_GLYCAN_COMPOSITIONS, O_GLYCAN_NAMES, O_GLYCAN_COMP_STRINGS
+    else:
+        compositions, names, comps = N_GLYCAN_COMPOSITIONS, N_GLYCAN_NAMES, N_GLYCAN_COMP_STRINGS
+    types = [g.glycan_type for g in compositions.values()]
+    # Masses stay float64: the %.4f display needs 8 significant digits,
+    # which float32 cannot carry, and the tables are a few dozen rows
+    masses = np.fromiter(
+        (g.mass for g in compositions.values()), dtype=np.float64, count=len(compositions)
+    )
+    return pd.DataFrame(
+        {"Name": names, "Composition": comps, "Mass (Da)": masses, "Type": types},
+        copy=False,
+    )
+
+
+@st.cache_data
+def _build_xl_df():
+    """Build the crosslinker library table once per process."""
+    names, formulas, spacers, cleavables, groups = [], [], [], [], []
+    for name, xl in CROSSLINKERS.items():
+        names.append(name)
+        formulas.append(xl.formula)
+        spacers.append(xl.spacer_length)
+        cleavables.append("Yes" if xl.cleavable else "No")
+        groups.append(xl.reactive_groups)
+    masses = np.fromiter(
+        (xl.intact_mass for xl in CROSSLINKERS.values()),
+        dtype=np.float64,
+        count=len(CROSSLINKERS),
+    )
+    return pd.DataFrame(
+        {
+            "Name": names,
+            "Formula": formulas,
+            "Intact Mass (Da)": masses,
+            "Spacer (Å)": spacers,
+            "MS-Cleavable": cleavables,
+            "Reactive Groups": groups,
+        },
+        copy=False,
+    )
+
+
+@st.cache_data
+def _build_stub_dfs():
+    """Stub-mass tables for the MS-cleavable crosslinkers, built once."""
+    return {
+        name: pd.DataFrame(
+            {
+                "Stub": list(xl.stub_masses),
+                "Mass (Da)": np.fromiter(
+                    xl.stub_masses.values(), dtype=np.float64, count=len(xl.stub_masses)
+                ),
+            },
+            copy=False,
+        )
+        for name, xl in CROSSLINKERS.items()
+        if xl.cleavable and xl.stub_masses
+    }
+
+
+@st.cache_data(max_entries=16, ttl="10m")
+def render_image(fig_json, fmt, width, height, scale=1):
+    """Rasterize a figure via Kaleido, cached on the figure JSON.
+
+    Switching export formats back and forth reruns the script; caching
+    here avoids re-invoking the Kaleido round-trip for an unchanged
+    spectrum.
+    """
+    import plotly.io as pio
+    return pio.to_image(pio.from_json(fig_json),
+                        format=fmt, width=width, height=height, scale=scale)
+
+
 # CSS with font adjustments (no color overrides - let Streamlit handle theme)
-def get_custom_css():
-    return """
+# Built once at import; reruns just re-emit the same string object
+_STATIC_CSS = """
         <style>
             /* Header styling */
             .header-container {
@@ -183,21 +380,22 @@ def get_custom_css():
         </style>
         """
 
-st.markdown(get_custom_css(), unsafe_allow_html=True)
-
 # Header with logo (IPSA-style layout with author branding)
 # Website URL - update when your personal website is live
 AUTHOR_WEBSITE = "https://longpingfu.com"  # Placeholder URL
 
-st.markdown(f'''
+_HEADER_HTML = f'''
 <div class="header-container">
     <div class="main-title">Spectrum Annotator Ddzby</div>
     <a href="{AUTHOR_WEBSITE}" target="_blank" class="author-logo">
         <span class="author-name">Longping Fu</span>
     </a>
 </div>
-''', unsafe_allow_html=True)
-st.markdown('<p class="sub-header">Universal MS/MS Spectrum Annotation for Glycopeptides and Crosslinked Peptides</p>', unsafe_allow_html=True)
+<p class="sub-header">Universal MS/MS Spectrum Annotation for Glycopeptides and Crosslinked Peptides</p>
+'''
+
+st.markdown(_STATIC_CSS, unsafe_allow_html=True)
+st.markdown(_HEADER_HTML, unsafe_allow_html=True)
 
 # Sidebar
 with st.sidebar:
@@ -284,9 +482,9 @@ with tab1:
             glycan_type = st.radio("Glycan Type", ["O-glycan", "N-glycan"], horizontal=True)
 
             if glycan_type == "O-glycan":
-                glycan_options = list(O_GLYCAN_COMPOSITIONS.keys())
+                glycan_options = O_GLYCAN_NAMES
             else:
-                glycan_options = list(N_GLYCAN_COMPOSITIONS.keys())
+                glycan_options = N_GLYCAN_NAMES
 
             selected_glycan = st.selectbox("Select Glycan", glycan_options)
 
@@ -315,7 +513,7 @@ with tab1:
 
             crosslinker = st.selectbox(
                 "Crosslinker",
-                list(CROSSLINKERS.keys())
+                CROSSLINKER_KEYS
             )
 
             xl = CROSSLINKERS[crosslinker]
@@ -350,26 +548,36 @@ with tab1:
 
         # Parse the text input into a dataframe for processing
         def parse_spectrum_text(text):
-            peaks = []
-            for line in text.strip().split('\n'):
-                line = line.strip()
-                if not line:
-                    continue
-                # Try tab separator first, then comma
-                if '\t' in line:
-                    parts = line.split('\t')
-                elif ',' in line:
-                    parts = line.split(',')
-                else:
-                    parts = line.split()
-                if len(parts) >= 2:
-                    try:
-                        mz = float(parts[0].strip())
-                        intensity = float(parts[1].strip())
-                        peaks.append({'Mass To Charge': mz, 'Intensity': intensity})
-                    except ValueError:
-                        continue
-            return pd.DataFrame(peaks) if peaks else pd.DataFrame({'Mass To Charge': [], 'Intensity': []})
+            # Normalize comma-separated input to whitespace so a single
+            # np.genfromtxt call parses the floats in C instead of a
+            # float()-per-field Python loop; invalid_raise=False plus the
+            # NaN row filter skips malformed lines (pasted header rows,
+            # stray text) the way the old per-line parser did, instead of
+            # discarding the whole peak list
+            if not text.strip():
+                return pd.DataFrame({'Mass To Charge': [], 'Intensity': []})
+            # A comma is a delimiter only when the line has no whitespace
+            # separator of its own; in a line like '100,1<TAB>200' it is a
+            # decimal mark or typo, and the row falls into the invalid-row
+            # drop below instead of becoming a peak at the wrong mass
+            normalized = []
+            for line in text.splitlines():
+                if ',' in line and ' ' not in line.strip() and '\t' not in line.strip():
+                    line = line.replace(',', ' ')
+                normalized.append(line)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                arr = np.genfromtxt(
+                    io.StringIO('\n'.join(normalized)),
+                    usecols=(0, 1),
+                    dtype=np.float64,
+                    invalid_raise=False,
+                )
+            arr = np.atleast_2d(arr)
+            if arr.size == 0:
+                return pd.DataFrame({'Mass To Charge': [], 'Intensity': []})
+            arr = arr[~np.isnan(arr).any(axis=1)]
+            return pd.DataFrame({'Mass To Charge': arr[:, 0], 'Intensity': arr[:, 1]}, copy=False)
 
         edited_df = parse_spectrum_text(spectrum_input)
 
@@ -384,278 +592,323 @@ with tab1:
         st.subheader("Results")
 
         if st.button("Annotate Spectrum", type="primary"):
-            # Parse spectrum from data editor
-            peaks = []
-            for _, row in edited_df.iterrows():
-                mz = row['Mass To Charge']
-                intensity = row['Intensity']
-                if pd.notna(mz) and pd.notna(intensity) and mz > 0 and intensity > 0:
-                    peaks.append((float(mz), float(intensity)))
-
-            if peaks:
-                mz_values = [p[0] for p in peaks]
-                intensities = [p[1] for p in peaks]
-                max_intensity = max(intensities) if intensities else 1
-
-                # Normalize to relative abundance (%)
-                rel_intensities = [i / max_intensity * 100 for i in intensities]
-
-                # Track matched ions and their errors for error plot
-                matched_ions = []
-                matched_errors = []
-                matched_mz = []
-
-                # Plot colors (light theme)
-                plot_bg = 'white'
-                paper_bg = 'white'
-                grid_color = '#e0e0e0'
-                text_color = 'black'
-                peak_color = unassigned_color
-
-                # Create subplot with main spectrum and error plot (IPSA-style)
-                fig = make_subplots(
-                    rows=2, cols=1,
-                    row_heights=[0.75, 0.25],
-                    shared_xaxes=True,
-                    vertical_spacing=0.08
-                )
+            # Parse spectrum from data editor with a vectorized mask
+            # instead of per-row iterrows
+            valid = edited_df.dropna(subset=['Mass To Charge', 'Intensity'])
+            valid = valid[(valid['Mass To Charge'] > 0) & (valid['Intensity'] > 0)]
+            mz_values = valid['Mass To Charge'].to_numpy(np.float64)
+            intensities = valid['Intensity'].to_numpy(np.float64)
+            n_peaks = mz_values.size
+
+            if n_peaks > 0:
+                # Normalize to relative abundance (%) - one scalar divide,
+                # then a single vector multiply
+                rel_intensities = intensities * (100.0 / intensities.max())
+
+                # The click handler only computes and stores results in
+                # session state; the results block below renders them on
+                # every rerun, so export-widget interactions (which rerun
+                # the script with the button returning False) keep them
+                # visible instead of blanking the page
+                fig_key = hash((peptide, mz_values.tobytes(), intensities.tobytes(),
+                                tolerance, tolerance_unit, analysis_type,
+                                precursor_charge, precursor_mz, unassigned_color))
+
+                # Rebuild only when the inputs actually changed
+                if st.session_state.get('annotation_key') != fig_key:
+                    # Track matched ions and their errors for error plot
+                    matched_ions = []
+                    matched_errors = []
+                    matched_mz = []
+
+                    # Annotations collected here and applied in one batch
+                    annotations = []
+
+                    # Plot colors (light theme)
+                    grid_color = '#e0e0e0'
+                    text_color = 'black'
+                    peak_color = unassigned_color
+
+                    # Create subplot with main spectrum and error plot (IPSA-style)
+                    fig = make_subplots(
+                        rows=2, cols=1,
+                        row_heights=[0.75, 0.25],
+                        shared_xaxes=True,
+                        vertical_spacing=0.08
+                    )
 
-                # Add peaks to main spectrum
-                for mz, rel_int in zip(mz_values, rel_intensities):
-                    fig.add_trace(go.Scatter(
-                        x=[mz, mz],
-                        y=[0, rel_int],
+                    # Add all peaks to main spectrum as one NaN-separated trace.
+                    # Raw m/z and intensity ride along as a numeric customdata
+                    # array; Plotly formats the hover text client-side instead
+                    # of us building a string per peak.
+                    peak_xs, peak_ys = peak_segments(mz_values, rel_intensities)
+                    fig.add_trace(go.Scattergl(
+                        x=peak_xs,
+                        y=peak_ys,
                         mode='lines',
                         line=dict(color=peak_color, width=1),
                         showlegend=False,
-                        hovertemplate=f'm/z: {mz:.4f}<br>Rel. Int: {rel_int:.1f}%<extra></extra>'
+                        customdata=np.repeat(
+                            np.column_stack([mz_values, intensities]), 3, axis=0
+                        ),
+                        hovertemplate=('m/z: %{customdata[0]:.4f}<br>'
+                                       'Int: %{customdata[1]:.0f}<extra></extra>')
                     ), row=1, col=1)
 
-                # Add oxonium ion annotations for glycopeptides
-                if analysis_type == "Glycopeptide":
-                    for ion_name, ion_mz in OXONIUM_IONS_EXTENDED.items():
-                        for i, (mz, rel_int) in enumerate(zip(mz_values, rel_intensities)):
-                            if tolerance_unit == "ppm":
-                                error_ppm = (mz - ion_mz) / ion_mz * 1e6
-                                match = abs(error_ppm) < tolerance
-                            else:
-                                error_ppm = (mz - ion_mz) / ion_mz * 1e6
-                                match = abs(mz - ion_mz) < tolerance
-
-                            if match:
-                                # Add colored peak
-                                fig.add_trace(go.Scatter(
-                                    x=[mz, mz],
-                                    y=[0, rel_int],
-                                    mode='lines',
-                                    line=dict(color=IPSA_COLORS['oxonium'], width=2),
-                                    showlegend=False,
-                                ), row=1, col=1)
-                                # Add annotation
-                                fig.add_annotation(
-                                    x=mz, y=rel_int,
-                                    text=ion_name,
-                                    showarrow=True,
-                                    arrowhead=2,
-                                    arrowsize=1,
-                                    arrowwidth=1,
-                                    ax=0, ay=-25,
-                                    font=dict(size=9, color=IPSA_COLORS['oxonium']),
-                                    row=1, col=1
-                                )
-                                matched_ions.append(ion_name)
-                                matched_errors.append(error_ppm)
-                                matched_mz.append(mz)
-                                break
-
-                # Add error plot markers (IPSA-style)
-                if matched_mz:
-                    fig.add_trace(go.Scatter(
-                        x=matched_mz,
-                        y=matched_errors,
-                        mode='markers',
-                        marker=dict(color=IPSA_COLORS['oxonium'], size=6),
-                        showlegend=False,
-                        hovertemplate='m/z: %{x:.4f}<br>Error: %{y:.2f} ppm<extra></extra>'
-                    ), row=2, col=1)
-
-                # Add zero line to error plot
-                fig.add_hline(y=0, line_dash="dash", line_color="gray", row=2, col=1)
-                fig.add_hline(y=tolerance, line_dash="dot", line_color="lightgray", row=2, col=1)
-                fig.add_hline(y=-tolerance, line_dash="dot", line_color="lightgray", row=2, col=1)
-
-                # Display peptide sequence at top (IPSA-style)
-                peptide_display = "   ".join(list(peptide))
-                fig.add_annotation(
-                    x=0.5, y=1.15,
-                    xref="paper", yref="paper",
-                    text=f"<b>{peptide_display}</b>",
-                    showarrow=False,
-                    font=dict(size=16, color=text_color, family="monospace"),
-                    xanchor="center"
-                )
+                    # Add oxonium ion annotations for glycopeptides
+                    if analysis_type == "Glycopeptide":
+                        # Vectorized peak-vs-ion matching: one call into the
+                        # (cached) matching kernel instead of a nested loop
+                        first_ion, peak_errors = annotate_oxonium(
+                            mz_values.tobytes(), tolerance, tolerance_unit
+                        )
+
+                        matched_rel = []
+                        for i in np.flatnonzero(first_ion >= 0):
+                            ion_name = OXONIUM_NAMES[first_ion[i]]
+                            mz = mz_values[i]
+                            rel_int = rel_intensities[i]
+                            matched_rel.append(rel_int)
+                            # Collect annotation (batched into update_layout below)
+                            annotations.append(dict(
+                                x=mz, y=rel_int,
+                                xref='x', yref='y',
+                                text=ion_name,
+                                showarrow=True,
+                                arrowhead=2,
+                                arrowsize=1,
+                                arrowwidth=1,
+                                ax=0, ay=-25,
+                                font=dict(size=9, color=IPSA_COLORS['oxonium']),
+                            ))
+                            matched_ions.append(ion_name)
+                            matched_errors.append(peak_errors[i])
+                            matched_mz.append(mz)
+
+                        # Overlay all matched peaks as a single colored trace
+                        if matched_mz:
+                            match_xs, match_ys = peak_segments(matched_mz, matched_rel)
+                            fig.add_trace(go.Scattergl(
+                                x=match_xs,
+                                y=match_ys,
+                                mode='lines',
+                                line=dict(color=IPSA_COLORS['oxonium'], width=2),
+                                showlegend=False,
+                            ), row=1, col=1)
+
+                    # Add error plot markers (IPSA-style)
+                    # Hand Plotly typed arrays so they serialize as base64
+                    # rather than per-number ASCII JSON
+                    if matched_mz:
+                        fig.add_trace(go.Scattergl(
+                            x=np.asarray(matched_mz, dtype=np.float64),
+                            y=np.asarray(matched_errors, dtype=np.float32),
+                            mode='markers',
+                            marker=dict(color=IPSA_COLORS['oxonium'], size=6),
+                            showlegend=False,
+                            hovertemplate='m/z: %{x:.4f}<br>Error: %{y:.2f} ppm<extra></extra>'
+                        ), row=2, col=1)
+
+                    # Add zero line to error plot
+                    fig.add_hline(y=0, line_dash="dash", line_color="gray", row=2, col=1)
+                    fig.add_hline(y=tolerance, line_dash="dot", line_color="lightgray", row=2, col=1)
+                    fig.add_hline(y=-tolerance, line_dash="dot", line_color="lightgray", row=2, col=1)
+
+                    # Display peptide sequence at top (IPSA-style)
+                    peptide_display = "   ".join(list(peptide))
+                    annotations.append(dict(
+                        x=0.5, y=1.15,
+                        xref="paper", yref="paper",
+                        text=f"<b>{peptide_display}</b>",
+                        showarrow=False,
+                        font=dict(size=16, color=text_color, family="monospace"),
+                        xanchor="center"
+                    ))
+
+                    # Add spectrum info (IPSA-style)
+                    info_text = f"Precursor m/z: {precursor_mz if precursor_mz > 0 else 'N/A'}    "
+                    info_text += f"Charge: +{precursor_charge}    "
+                    info_text += f"Matched Ions: {len(matched_ions)}/{n_peaks}"
+                    annotations.append(dict(
+                        x=0.5, y=1.08,
+                        xref="paper", yref="paper",
+                        text=info_text,
+                        showarrow=False,
+                        font=dict(size=11, color=text_color),
+                        xanchor="center"
+                    ))
+
+                    # Apply annotations plus the static layout in one
+                    # validation pass
+                    fig.update_layout(annotations=annotations, **BASE_LAYOUT)
+
+                    fig.update_xaxes(
+                        title_text="m/z",
+                        gridcolor=grid_color,
+                        linecolor=grid_color,
+                        row=2, col=1
+                    )
+                    fig.update_xaxes(
+                        gridcolor=grid_color,
+                        linecolor=grid_color,
+                        row=1, col=1
+                    )
+                    fig.update_yaxes(
+                        title_text="Relative Abundance (%)",
+                        gridcolor=grid_color,
+                        linecolor=grid_color,
+                        row=1, col=1
+                    )
+                    fig.update_yaxes(
+                        title_text="Error (ppm)",
+                        gridcolor=grid_color,
+                        linecolor=grid_color,
+                        range=[-tolerance * 1.5, tolerance * 1.5],
+                        row=2, col=1
+                    )
 
-                # Add spectrum info (IPSA-style)
-                info_text = f"Precursor m/z: {precursor_mz if precursor_mz > 0 else 'N/A'}    "
-                info_text += f"Charge: +{precursor_charge}    "
-                info_text += f"Matched Ions: {len(matched_ions)}/{len(peaks)}"
-                fig.add_annotation(
-                    x=0.5, y=1.08,
-                    xref="paper", yref="paper",
-                    text=info_text,
-                    showarrow=False,
-                    font=dict(size=11, color=text_color),
-                    xanchor="center"
-                )
 
-                fig.update_layout(
-                    plot_bgcolor=plot_bg,
-                    paper_bgcolor=paper_bg,
-                    showlegend=False,
-                    height=600,
-                    margin=dict(t=100, b=50),
-                    font=dict(color=text_color),
-                )
+                    st.session_state['annotation_key'] = fig_key
+                    st.session_state['annotation_fig'] = fig
+                    st.session_state['annotation_matched_mz'] = matched_mz
+                    st.session_state['annotation_matched_ions'] = matched_ions
+                    st.session_state['annotation_matched_errors'] = matched_errors
 
-                fig.update_xaxes(
-                    title_text="m/z",
-                    gridcolor=grid_color,
-                    linecolor=grid_color,
-                    row=2, col=1
-                )
-                fig.update_xaxes(
-                    gridcolor=grid_color,
-                    linecolor=grid_color,
-                    row=1, col=1
-                )
-                fig.update_yaxes(
-                    title_text="Relative Abundance (%)",
-                    gridcolor=grid_color,
-                    linecolor=grid_color,
-                    row=1, col=1
-                )
-                fig.update_yaxes(
-                    title_text="Error (ppm)",
-                    gridcolor=grid_color,
-                    linecolor=grid_color,
-                    range=[-tolerance * 1.5, tolerance * 1.5],
-                    row=2, col=1
-                )
+                st.session_state['annotation_peaks'] = (mz_values, intensities,
+                                                        rel_intensities)
+            else:
+                # Invalid input clears any previous results
+                for _key in ('annotation_key', 'annotation_fig',
+                             'annotation_matched_mz', 'annotation_matched_ions',
+                             'annotation_matched_errors', 'annotation_peaks'):
+                    st.session_state.pop(_key, None)
+                st.error("No valid peaks found in input")
 
-                st.plotly_chart(fig, width="stretch")
-
-                # Export options
-                st.markdown("**Export Options**")
-                col_format, col_dpi = st.columns([2, 1])
-                with col_format:
-                    export_format = st.selectbox(
-                        "Format",
-                        ["PDF", "TIFF", "EMF", "SVG", "PNG"],
-                        index=0,
-                        label_visibility="collapsed"
-                    )
-                with col_dpi:
-                    if export_format == "TIFF":
-                        tiff_dpi = st.number_input("DPI", min_value=72, max_value=1200, value=600, step=50)
-                    else:
-                        tiff_dpi = 600  # default
-
-                # Export buttons
-                col_btn1, col_btn2, col_btn3 = st.columns(3)
-                with col_btn1:
-                    try:
-                        if export_format == "PDF":
-                            pdf_bytes = fig.to_image(format="pdf", width=1200, height=800)
-                            st.download_button(
-                                "Download PDF",
-                                data=pdf_bytes,
-                                file_name="spectrum.pdf",
-                                mime="application/pdf"
-                            )
-                        elif export_format == "TIFF":
-                            if PIL_AVAILABLE:
-                                # Export as PNG first, then convert to TIFF
-                                png_bytes = fig.to_image(format="png", width=int(8*tiff_dpi), height=int(6*tiff_dpi), scale=1)
-                                img = Image.open(io.BytesIO(png_bytes))
-                                tiff_buffer = io.BytesIO()
-                                img.save(tiff_buffer, format="TIFF", dpi=(tiff_dpi, tiff_dpi), compression="tiff_lzw")
-                                tiff_buffer.seek(0)
-                                st.download_button(
-                                    f"Download TIFF ({tiff_dpi} DPI)",
-                                    data=tiff_buffer.getvalue(),
-                                    file_name="spectrum.tiff",
-                                    mime="image/tiff"
-                                )
-                            else:
-                                st.warning("Install Pillow for TIFF export: pip install Pillow")
-                        elif export_format == "EMF":
-                            # EMF export via SVG (users can convert with Inkscape or other tools)
-                            svg_bytes = fig.to_image(format="svg", width=1200, height=800)
-                            st.download_button(
-                                "Download SVG (convert to EMF)",
-                                data=svg_bytes,
-                                file_name="spectrum.svg",
-                                mime="image/svg+xml",
-                                help="EMF: Open SVG in Inkscape and save as EMF"
-                            )
-                        elif export_format == "SVG":
-                            svg_bytes = fig.to_image(format="svg", width=1200, height=800)
-                            st.download_button(
-                                "Download SVG",
-                                data=svg_bytes,
-                                file_name="spectrum.svg",
-                                mime="image/svg+xml"
-                            )
-                        elif export_format == "PNG":
-                            png_bytes = fig.to_image(format="png", width=1200, height=800, scale=2)
+        # Results and export read from session state on every rerun
+        if 'annotation_key' in st.session_state:
+            fig = st.session_state['annotation_fig']
+            matched_mz = st.session_state['annotation_matched_mz']
+            matched_ions = st.session_state['annotation_matched_ions']
+            matched_errors = st.session_state['annotation_matched_errors']
+            mz_values, intensities, rel_intensities = \
+                st.session_state['annotation_peaks']
+            n_peaks = mz_values.size
+
+            st.plotly_chart(fig, width="stretch")
+
+            # Export options
+            st.markdown("**Export Options**")
+            col_format, col_dpi = st.columns([2, 1])
+            with col_format:
+                export_format = st.selectbox(
+                    "Format",
+                    ["PDF", "TIFF", "EMF", "SVG", "PNG"],
+                    index=0,
+                    label_visibility="collapsed"
+                )
+            with col_dpi:
+                if export_format == "TIFF":
+                    tiff_dpi = st.number_input("DPI", min_value=72, max_value=1200, value=600, step=50)
+                else:
+                    tiff_dpi = 600  # default
+
+            # Export buttons
+            col_btn1, col_btn2, col_btn3 = st.columns(3)
+            with col_btn1:
+                try:
+                    if export_format == "PDF":
+                        pdf_bytes = render_image(fig.to_json(), "pdf", 1200, 800)
+                        st.download_button(
+                            "Download PDF",
+                            data=pdf_bytes,
+                            file_name="spectrum.pdf",
+                            mime="application/pdf"
+                        )
+                    elif export_format == "TIFF":
+                        if PIL_AVAILABLE:
+                            # Export as PNG first, then convert to TIFF.
+                            # Render at a fixed pixel size and carry the
+                            # DPI as metadata - rasterizing 8x6 inches of
+                            # pixels at 600 DPI would be a 17 MP image
+                            png_bytes = render_image(fig.to_json(), "png", 2400, 1800, scale=1)
+                            img = Image.open(io.BytesIO(png_bytes))
+                            img.load()
+                            tiff_buffer = io.BytesIO()
+                            img.save(tiff_buffer, format="TIFF", dpi=(tiff_dpi, tiff_dpi), compression="tiff_lzw")
+                            tiff_buffer.seek(0)
                             st.download_button(
-                                "Download PNG",
-                                data=png_bytes,
-                                file_name="spectrum.png",
-                                mime="image/png"
+                                f"Download TIFF ({tiff_dpi} DPI)",
+                                data=tiff_buffer.getvalue(),
+                                file_name="spectrum.tiff",
+                                mime="image/tiff"
                             )
-                    except Exception as e:
-                        st.error(f"Export failed. Install kaleido: pip install kaleido")
-
-                with col_btn2:
-                    # Export matched data
-                    export_data = pd.DataFrame({
-                        'm/z': matched_mz,
-                        'Ion': matched_ions,
-                        'Error (ppm)': matched_errors
-                    })
-                    st.download_button(
-                        "Export Annotations",
-                        data=export_data.to_csv(index=False),
-                        file_name="matched_ions.csv",
-                        mime="text/csv"
-                    )
-                with col_btn3:
-                    # Export peak list
-                    peak_data = pd.DataFrame({
-                        'm/z': mz_values,
-                        'Intensity': intensities,
-                        'Relative (%)': rel_intensities
-                    })
-                    st.download_button(
-                        "Export Peak List",
-                        data=peak_data.to_csv(index=False),
-                        file_name="peak_list.csv",
-                        mime="text/csv"
-                    )
+                        else:
+                            st.warning("Install Pillow for TIFF export: pip install Pillow")
+                    elif export_format == "EMF":
+                        # EMF export via SVG (users can convert with Inkscape or other tools)
+                        svg_bytes = render_image(fig.to_json(), "svg", 1200, 800)
+                        st.download_button(
+                            "Download SVG (convert to EMF)",
+                            data=svg_bytes,
+                            file_name="spectrum.svg",
+                            mime="image/svg+xml",
+                            help="EMF: Open SVG in Inkscape and save as EMF"
+                        )
+                    elif export_format == "SVG":
+                        svg_bytes = render_image(fig.to_json(), "svg", 1200, 800)
+                        st.download_button(
+                            "Download SVG",
+                            data=svg_bytes,
+                            file_name="spectrum.svg",
+                            mime="image/svg+xml"
+                        )
+                    elif export_format == "PNG":
+                        png_bytes = render_image(fig.to_json(), "png", 1200, 800, scale=2)
+                        st.download_button(
+                            "Download PNG",
+                            data=png_bytes,
+                            file_name="spectrum.png",
+                            mime="image/png"
+                        )
+                except Exception as e:
+                    st.error(f"Export failed. Install kaleido: pip install kaleido")
+
+            with col_btn2:
+                # Export matched data (csv.writer avoids building a
+                # DataFrame just to serialize it)
+                ann_buf = io.StringIO()
+                ann_writer = csv.writer(ann_buf)
+                ann_writer.writerow(['m/z', 'Ion', 'Error (ppm)'])
+                ann_writer.writerows(zip(matched_mz, matched_ions, matched_errors))
+                st.download_button(
+                    "Export Annotations",
+                    data=ann_buf.getvalue(),
+                    file_name="matched_ions.csv",
+                    mime="text/csv"
+                )
+            with col_btn3:
+                # Export peak list
+                peak_buf = io.StringIO()
+                peak_writer = csv.writer(peak_buf)
+                peak_writer.writerow(['m/z', 'Intensity', 'Relative (%)'])
+                peak_writer.writerows(zip(mz_values, intensities, rel_intensities))
+                st.download_button(
+                    "Export Peak List",
+                    data=peak_buf.getvalue(),
+                    file_name="peak_list.csv",
+                    mime="text/csv"
+                )
 
-                # Summary statistics
-                st.subheader("Annotation Summary")
-                coverage = len(matched_ions) / len(peaks) * 100 if peaks else 0
-                col_a, col_b, col_c = st.columns(3)
-                with col_a:
-                    st.metric("Total Peaks", len(peaks))
-                with col_b:
-                    st.metric("Annotated", len(matched_ions))
-                with col_c:
-                    st.metric("Coverage", f"{coverage:.1f}%")
-            else:
-                st.error("No valid peaks found in input")
+            # Summary statistics
+            st.subheader("Annotation Summary")
+            coverage = len(matched_ions) / n_peaks * 100 if n_peaks else 0
+            col_a, col_b, col_c = st.columns(3)
+            with col_a:
+                st.metric("Total Peaks", n_peaks)
+            with col_b:
+                st.metric("Annotated", len(matched_ions))
+            with col_c:
+                st.metric("Coverage", f"{coverage:.1f}%")
 
 with tab2:
     st.subheader("Glycan Composition Library")
@@ -666,94 +919,84 @@ with tab2:
         st.markdown("### Common Human O-Glycans")
         st.markdown("Based on MSFragger Human O-glycan database")
 
-        o_glycan_data = []
-        for name, glycan in O_GLYCAN_COMPOSITIONS.items():
-            comp_str = ', '.join([f"{k}({v})" for k, v in glycan.composition.items()])
-            o_glycan_data.append({
-                "Name": name,
-                "Composition": comp_str,
-                "Mass (Da)": f"{glycan.mass:.4f}",
-                "Type": glycan.glycan_type
-            })
-
-        df_o = pd.DataFrame(o_glycan_data)
-        st.dataframe(df_o, width="stretch", hide_index=True)
+        st.dataframe(
+            _build_glycan_df("O"),
+            width="stretch",
+            hide_index=True,
+            column_config={"Mass (Da)": st.column_config.NumberColumn("Mass (Da)", format="%.4f")},
+        )
 
     with glycan_tab2:
         st.markdown("### Common N-Glycans")
 
-        n_glycan_data = []
-        for name, glycan in N_GLYCAN_COMPOSITIONS.items():
-            comp_str = ', '.join([f"{k}({v})" for k, v in glycan.composition.items()])
-            n_glycan_data.append({
-                "Name": name,
-                "Composition": comp_str,
-                "Mass (Da)": f"{glycan.mass:.4f}",
-                "Type": glycan.glycan_type
-            })
-
-        df_n = pd.DataFrame(n_glycan_data)
-        st.dataframe(df_n, width="stretch", hide_index=True)
+        st.dataframe(
+            _build_glycan_df("N"),
+            width="stretch",
+            hide_index=True,
+            column_config={"Mass (Da)": st.column_config.NumberColumn("Mass (Da)", format="%.4f")},
+        )
 
     # Glycan mass calculator
     st.subheader("Glycan Mass Calculator")
 
-    col1, col2 = st.columns(2)
-    with col1:
-        calc_hexnac = st.number_input("HexNAc", min_value=0, max_value=10, value=2)
-        calc_hex = st.number_input("Hex", min_value=0, max_value=10, value=5)
-        calc_fuc = st.number_input("Fuc", min_value=0, max_value=5, value=0)
-    with col2:
-        calc_neuac = st.number_input("NeuAc", min_value=0, max_value=5, value=0)
-        calc_neugc = st.number_input("NeuGc", min_value=0, max_value=5, value=0)
-        calc_sulfate = st.number_input("Sulfate", min_value=0, max_value=3, value=0)
-
-    total_mass = (
-        calc_hexnac * MONOSACCHARIDE_MASSES['HexNAc'] +
-        calc_hex * MONOSACCHARIDE_MASSES['Hex'] +
-        calc_fuc * MONOSACCHARIDE_MASSES['Fuc'] +
-        calc_neuac * MONOSACCHARIDE_MASSES['NeuAc'] +
-        calc_neugc * MONOSACCHARIDE_MASSES['NeuGc'] +
-        calc_sulfate * MONOSACCHARIDE_MASSES['Sulfate']
-    )
+    # Fragment so editing a count only reruns the calculator, not the
+    # whole app (and not the annotation pipeline in tab 1)
+    @st.fragment
+    def glycan_mass_calculator():
+        col1, col2 = st.columns(2)
+        with col1:
+            calc_hexnac = st.number_input("HexNAc", min_value=0, max_value=10, value=2)
+            calc_hex = st.number_input("Hex", min_value=0, max_value=10, value=5)
+            calc_fuc = st.number_input("Fuc", min_value=0, max_value=5, value=0)
+        with col2:
+            calc_neuac = st.number_input("NeuAc", min_value=0, max_value=5, value=0)
+            calc_neugc = st.number_input("NeuGc", min_value=0, max_value=5, value=0)
+            calc_sulfate = st.number_input("Sulfate", min_value=0, max_value=3, value=0)
+
+        counts = np.array(
+            [calc_hexnac, calc_hex, calc_fuc, calc_neuac, calc_neugc, calc_sulfate],
+            dtype=np.float64,
+        )
+        total_mass = float(_CALC_MASSES @ counts)
+
+        parts = [f"HexNAc{calc_hexnac}Hex{calc_hex}"]
+        if calc_fuc > 0:
+            parts.append(f"Fuc{calc_fuc}")
+        if calc_neuac > 0:
+            parts.append(f"NeuAc{calc_neuac}")
+        if calc_neugc > 0:
+            parts.append(f"NeuGc{calc_neugc}")
+        if calc_sulfate > 0:
+            parts.append(f"Sulfate{calc_sulfate}")
+        comp_string = ''.join(parts)
 
-    comp_string = f"HexNAc{calc_hexnac}Hex{calc_hex}"
-    if calc_fuc > 0:
-        comp_string += f"Fuc{calc_fuc}"
-    if calc_neuac > 0:
-        comp_string += f"NeuAc{calc_neuac}"
-    if calc_neugc > 0:
-        comp_string += f"NeuGc{calc_neugc}"
-    if calc_sulfate > 0:
-        comp_string += f"Sulfate{calc_sulfate}"
+        st.success(f"**Composition:** {comp_string}\n\n**Mass:** {total_mass:.4f} Da")
 
-    st.success(f"**Composition:** {comp_string}\n\n**Mass:** {total_mass:.4f} Da")
+    glycan_mass_calculator()
 
 with tab3:
     st.subheader("Crosslinker Library")
 
-    xl_data = []
-    for name, xl in CROSSLINKERS.items():
-        xl_data.append({
-            "Name": name,
-            "Formula": xl.formula,
-            "Intact Mass (Da)": f"{xl.intact_mass:.4f}",
-            "Spacer (Å)": xl.spacer_length,
-            "MS-Cleavable": "Yes" if xl.cleavable else "No",
-            "Reactive Groups": xl.reactive_groups
-        })
-
-    df_xl = pd.DataFrame(xl_data)
-    st.dataframe(df_xl, width="stretch", hide_index=True)
+    st.dataframe(
+        _build_xl_df(),
+        width="stretch",
+        hide_index=True,
+        column_config={
+            "Intact Mass (Da)": st.column_config.NumberColumn("Intact Mass (Da)", format="%.4f")
+        },
+    )
 
     # Stub mass details
     st.subheader("MS-Cleavable Crosslinker Stub Masses")
 
-    for name, xl in CROSSLINKERS.items():
-        if xl.cleavable and xl.stub_masses:
-            st.markdown(f"#### {name}")
-            stub_data = [{"Stub": k, "Mass (Da)": f"{v:.4f}"} for k, v in xl.stub_masses.items()]
-            st.dataframe(pd.DataFrame(stub_data), width="stretch", hide_index=True)
+    for name, stub_df in _build_stub_dfs().items():
+        st.markdown(f"#### {name}")
+        st.dataframe(
+            stub_df,
+            width="stretch",
+            hide_index=True,
+            column_config={"Mass (Da)": st.column_config.NumberColumn("Mass (Da)", format="%.4f")},
+        )
 
 with tab4:
     st.subheader("About Spectrum Annotator Ddzby")
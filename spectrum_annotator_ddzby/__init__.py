@@ -18,6 +18,7 @@ __author__ = "Longping Fu"
 
 from .fragment_calculator import (
     FragmentCalculator,
+    get_fragment_calculator,
     TheoreticalIon,
     MatchedIon,
     FalseMatchRate,
@@ -31,12 +32,6 @@ from .fragment_calculator import (
     MOD_MASSES,
 )
 
-from .annotator import (
-    SpectrumAnnotator,
-    annotate_spectra_batch,
-    ION_COLORS,
-)
-
 from .glycan_library import (
     # Monosaccharide masses
     MONOSACCHARIDE_MASSES,
@@ -44,17 +39,23 @@ from .glycan_library import (
     OXONIUM_IONS_EXTENDED,
     OXONIUM_IONS_O_GLCNAC,
     OXONIUM_IONS_N_GLYCAN,
+    match_oxonium_ions,
     # Glycan compositions
     GlycanComposition,
     O_GLYCAN_COMPOSITIONS,
     N_GLYCAN_COMPOSITIONS,
+    O_GLYCAN_NAMES,
+    N_GLYCAN_NAMES,
     # Y ion generation
     generate_y_ion_series,
     generate_n_glycan_y_ions,
+    generate_n_glycan_y_ions_batch,
     # Utilities
     identify_glycan_from_mass,
+    identify_glycans_from_masses,
     get_glycan_mass,
     parse_proforma_glycan,
+    parse_proforma_glycans,
     # Crosslinker support
     Crosslinker,
     CROSSLINKERS,
@@ -68,6 +69,23 @@ from .glycan_library import (
     parse_proforma_crosslink,
 )
 
+# The annotator pulls in matplotlib, which dominates import time for
+# callers that only need the calculation/matching layers. Its exports
+# are resolved lazily on first access (PEP 562) and then cached in the
+# module namespace.
+_ANNOTATOR_EXPORTS = frozenset(["SpectrumAnnotator", "annotate_spectra_batch", "ION_COLORS"])
+
+
+def __getattr__(name):
+    if name in _ANNOTATOR_EXPORTS:
+        from . import annotator
+
+        value = getattr(annotator, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = [
     # Classes
     "FragmentCalculator",
@@ -78,6 +96,7 @@ __all__ = [
     "GlycanComposition",
     "Crosslinker",
     # Functions
+    "get_fragment_calculator",
     "match_peaks",
     "calculate_false_match_rate",
     "calculate_annotation_statistics",
@@ -85,9 +104,13 @@ __all__ = [
     "annotate_spectra_batch",
     "generate_y_ion_series",
     "generate_n_glycan_y_ions",
+    "generate_n_glycan_y_ions_batch",
+    "match_oxonium_ions",
     "identify_glycan_from_mass",
+    "identify_glycans_from_masses",
     "get_glycan_mass",
     "parse_proforma_glycan",
+    "parse_proforma_glycans",
     # Crosslinker functions
     "generate_crosslink_fragments",
     "identify_crosslink_stubs",
@@ -106,6 +129,8 @@ __all__ = [
     # Constants - Glycan compositions
     "O_GLYCAN_COMPOSITIONS",
     "N_GLYCAN_COMPOSITIONS",
+    "O_GLYCAN_NAMES",
+    "N_GLYCAN_NAMES",
     # Constants - Crosslinkers
     "CROSSLINKERS",
     "DSSO",
@@ -21,6 +21,7 @@ import json
 # Import the fragment calculator (relative import for package)
 from .fragment_calculator import (
     FragmentCalculator,
+    get_fragment_calculator,
     TheoreticalIon,
     MatchedIon,
     FalseMatchRate,
@@ -104,7 +105,7 @@ class SpectrumAnnotator:
         self.activation_type = activation_type.upper()
 
         # Calculate theoretical fragments
-        self.calculator = FragmentCalculator(
+        self.calculator = get_fragment_calculator(
             peptide, modifications, precursor_charge, max_fragment_charge=2
         )
 
@@ -523,7 +524,8 @@ def annotate_spectra_batch(summary_file: str,
 
     Args:
         summary_file: Path to extracted spectra summary CSV
-        spectra_dir: Directory containing spectrum CSV files
+        spectra_dir: NPZ bundle of extracted spectra, or a directory of
+            legacy per-scan spectrum CSV files
         output_dir: Directory for output PDFs
         n_spectra: Number of spectra to process (None = all)
         tolerance_ppm: Mass tolerance in ppm
@@ -535,6 +537,9 @@ def annotate_spectra_batch(summary_file: str,
     # Load summary
     df = pd.read_csv(summary_file)
 
+    # One mmap'd open for the NPZ bundle; arrays decompress on access
+    spectra_bundle = np.load(spectra_dir) if spectra_dir.endswith('.npz') else None
+
     if n_spectra:
         df = df.head(n_spectra)
 
@@ -549,10 +554,15 @@ def annotate_spectra_batch(summary_file: str,
 
         try:
             # Load spectrum data
-            spec_file = os.path.join(spectra_dir, row['spectrum_file'])
-            spec_df = pd.read_csv(spec_file)
-            exp_mz = spec_df['mz'].values
-            exp_intensity = spec_df['intensity'].values
+            if spectra_bundle is not None:
+                spec_arr = spectra_bundle[row['spectrum_file']]
+                exp_mz = spec_arr[:, 0]
+                exp_intensity = spec_arr[:, 1]
+            else:
+                spec_file = os.path.join(spectra_dir, row['spectrum_file'])
+                spec_df = pd.read_csv(spec_file)
+                exp_mz = spec_df['mz'].values
+                exp_intensity = spec_df['intensity'].values
 
             # Parse modifications
             if 'modifications_json' in row and pd.notna(row['modifications_json']):
@@ -632,7 +642,7 @@ if __name__ == "__main__":
     OUTPUT_PATH = os.path.join(SOURCE_PATH, "point_to_point_response/")
 
     summary_file = os.path.join(OUTPUT_PATH, "extracted_spectra_EThcD_HEK293T_summary.csv")
-    spectra_dir = os.path.join(OUTPUT_PATH, "extracted_spectra_EThcD_HEK293T")
+    spectra_dir = os.path.join(OUTPUT_PATH, "extracted_spectra_EThcD_HEK293T.npz")
     output_dir = os.path.join(OUTPUT_PATH, "annotated_spectra_test")
 
     print("=" * 70)
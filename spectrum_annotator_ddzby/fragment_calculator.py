@@ -11,6 +11,7 @@ Author: Longping Fu
 
 import numpy as np
 from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import List, Dict, Tuple, Optional, Set, Union
 import json
 import re
@@ -157,6 +158,32 @@ class MatchedIon(TheoreticalIon):
     mass_error_ppm: float = 0.0
 
 
+def _build_oxonium_ion_list(oxonium_set):
+    """Materialize a TheoreticalIon tuple for one oxonium library."""
+    return tuple(
+        TheoreticalIon(
+            ion_type='oxonium',
+            ion_number=0,
+            charge=1,
+            mz=mz,
+            sequence='',
+            annotation=name,
+        )
+        for name, mz in oxonium_set.items()
+    )
+
+
+# The oxonium libraries are module constants, so the TheoreticalIon
+# objects they produce are built once at import; calculate_oxonium_ions
+# just hands out a fresh list over the shared ions per call
+_OXONIUM_ION_LISTS = {
+    'extended': _build_oxonium_ion_list(OXONIUM_IONS_EXTENDED),
+    'o_glcnac': _build_oxonium_ion_list(OXONIUM_IONS_O_GLCNAC),
+    'n_glycan': _build_oxonium_ion_list(OXONIUM_IONS_N_GLYCAN),
+    'basic': _build_oxonium_ion_list(OXONIUM_IONS),
+}
+
+
 # =============================================================================
 # FRAGMENT CALCULATOR CLASS
 # =============================================================================
@@ -689,36 +716,24 @@ class FragmentCalculator:
         Returns:
             List of oxonium ion TheoreticalIon objects
         """
-        ions = []
-
         if use_extended is None:
             use_extended = self.use_extended_oxonium
 
         # Select oxonium ion set based on glycan type and settings
         if use_extended:
-            oxonium_set = OXONIUM_IONS_EXTENDED
+            set_key = 'extended'
         else:
             # Auto-select based on detected glycan type
             glycan_type = self._get_glycan_type()
             if glycan_type in ['HexNAc_TMT', 'HexNAc', 'O-GlcNAc', 'O-GalNAc']:
-                oxonium_set = OXONIUM_IONS_O_GLCNAC
+                set_key = 'o_glcnac'
             elif glycan_type == 'N-glycan':
-                oxonium_set = OXONIUM_IONS_N_GLYCAN
+                set_key = 'n_glycan'
             else:
-                oxonium_set = OXONIUM_IONS
-
-        for name, mz in oxonium_set.items():
-            ion = TheoreticalIon(
-                ion_type='oxonium',
-                ion_number=0,
-                charge=1,
-                mz=mz,
-                sequence='',
-                annotation=name
-            )
-            ions.append(ion)
+                set_key = 'basic'
 
-        return ions
+        # The ions themselves are prebuilt at import; only the list is new
+        return list(_OXONIUM_ION_LISTS[set_key])
 
     def calculate_neutral_loss_ions(self,
                                     base_ions: List[TheoreticalIon],
@@ -855,6 +870,53 @@ class FragmentCalculator:
         return flat_list
 
 
+@lru_cache(maxsize=8192)
+def _cached_fragment_calculator(
+    peptide: str,
+    mods_key: Tuple[Tuple[int, str, float, str], ...],
+    precursor_charge: int,
+    max_fragment_charge: int,
+    glycan_type: str,
+    use_extended_oxonium: bool,
+) -> FragmentCalculator:
+    """Memoized FragmentCalculator construction, keyed on hashable inputs."""
+    modifications = [
+        {'position': position, 'residue': residue, 'mass': mass, 'name': name}
+        for position, residue, mass, name in mods_key
+    ]
+    return FragmentCalculator(
+        peptide, modifications, precursor_charge,
+        max_fragment_charge=max_fragment_charge,
+        glycan_type=glycan_type,
+        use_extended_oxonium=use_extended_oxonium,
+    )
+
+
+def get_fragment_calculator(peptide: str,
+                            modifications: List[Dict],
+                            precursor_charge: int,
+                            max_fragment_charge: int = 2,
+                            glycan_type: str = 'auto',
+                            use_extended_oxonium: bool = False) -> FragmentCalculator:
+    """
+    Memoized FragmentCalculator factory for batch annotation.
+
+    Many PSMs in a batch share the same peptide, modifications and
+    charge; routing construction through this factory makes repeat
+    rows a cache hit instead of regenerating residue masses and ion
+    series from scratch. Treat the returned calculator (and the ion
+    lists it produces) as read-only, since it may be shared.
+    """
+    mods_key = tuple(sorted(
+        (mod['position'], mod.get('residue', ''), round(mod['mass'], 6), mod.get('name', ''))
+        for mod in modifications
+    ))
+    return _cached_fragment_calculator(
+        peptide, mods_key, precursor_charge,
+        max_fragment_charge, glycan_type, use_extended_oxonium,
+    )
+
+
 # =============================================================================
 # PEAK MATCHING
 # =============================================================================
@@ -901,15 +963,20 @@ def match_peaks(theoretical_ions: List[TheoreticalIon],
 
     sorted_ions = sorted(theoretical_ions, key=ion_sort_key)
 
+    # Sort the peak list once so each tolerance window is a bisection
+    # instead of a full |exp_mz - target| scan per ion and isotope
+    peak_order = np.argsort(exp_mz, kind='stable')
+    sorted_mz = exp_mz[peak_order]
+
+    # Try monoisotopic first, then isotopes if enabled
+    isotope_offsets = [0]
+    if match_isotopes:
+        isotope_offsets = list(range(max_isotope + 1))  # [0, 1, 2]
+
     for ion in sorted_ions:
         theo_mz = ion.mz
         found_match = False
 
-        # Try monoisotopic first, then isotopes if enabled
-        isotope_offsets = [0]
-        if match_isotopes:
-            isotope_offsets = list(range(max_isotope + 1))  # [0, 1, 2]
-
         for iso_offset in isotope_offsets:
             if found_match:
                 break
@@ -919,7 +986,9 @@ def match_peaks(theoretical_ions: List[TheoreticalIon],
             tol = target_mz * tolerance_ppm / 1e6
 
             # Find peaks within tolerance
-            matches = np.where(np.abs(exp_mz - target_mz) <= tol)[0]
+            lo = np.searchsorted(sorted_mz, target_mz - tol, side='left')
+            hi = np.searchsorted(sorted_mz, target_mz + tol, side='right')
+            matches = peak_order[lo:hi]
 
             if len(matches) > 0:
                 # Find the closest match that hasn't been used
@@ -14,8 +14,13 @@ Author: Longping Fu
 """
 
 from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Dict, List, Optional, Tuple
 import re
+import sys
+
+import numpy as np
 
 # =============================================================================
 # MONOSACCHARIDE MASSES (monoisotopic)
@@ -52,13 +57,71 @@ MONOSACCHARIDE_MASSES = {
     'Phosphate': 79.9663,   # Phosphate modification
 }
 
+# Intern the key strings so hot 'HexNAc' in comp / comp['HexNAc'] dict
+# probes short-circuit on pointer identity instead of byte comparison
+# (source-code literals at consumer sites are interned by the compiler)
+MONOSACCHARIDE_MASSES = {sys.intern(k): v for k, v in MONOSACCHARIDE_MASSES.items()}
+
+# Parallel index/vector view of the mass table for vectorized sums, and a
+# read-only proxy so the table cannot be mutated behind the arrays' back
+_MONO_KEYS: Tuple[str, ...] = tuple(MONOSACCHARIDE_MASSES)
+_MONO_IDX: Dict[str, int] = {k: i for i, k in enumerate(_MONO_KEYS)}
+_MONO_VEC = np.fromiter(
+    MONOSACCHARIDE_MASSES.values(), dtype=np.float64, count=len(MONOSACCHARIDE_MASSES)
+)
+MONOSACCHARIDE_MASSES = MappingProxyType(MONOSACCHARIDE_MASSES)
+
+# Hot-path scalar constants: a plain global float load beats a dict
+# probe per access inside the Y-ion generators
+_M_HEXNAC = MONOSACCHARIDE_MASSES['HexNAc']
+_M_HEX = MONOSACCHARIDE_MASSES['Hex']
+_M_FUC = MONOSACCHARIDE_MASSES['Fuc']
+_M_NEUAC = MONOSACCHARIDE_MASSES['NeuAc']
+_H2O = 18.0106
+
+# Composition strings like "HexNAc2Hex5" - compiled once at import
+@lru_cache(maxsize=4096)
+def _parse_composition(comp_string: str) -> Tuple[Tuple[str, int], ...]:
+    """Parse a composition string into (monosaccharide, count) pairs.
+
+    Hand-rolled scanner over letter/digit runs - no regex engine on
+    this path. Letter runs without a trailing count and names outside
+    MONOSACCHARIDE_MASSES are skipped, as the old pattern did.
+
+    Memoized: the same composition strings recur constantly when scanning
+    glycan databases or annotating batches of PSMs.
+    """
+    pairs = []
+    i, n = 0, len(comp_string)
+    while i < n:
+        if not comp_string[i].isalpha():
+            i += 1
+            continue
+        j = i
+        while j < n and comp_string[j].isalpha():
+            j += 1
+        k = j
+        while k < n and comp_string[k].isdigit():
+            k += 1
+        if k > j:
+            name = comp_string[i:j]
+            if name in MONOSACCHARIDE_MASSES:
+                pairs.append((sys.intern(name), int(comp_string[j:k])))
+        i = max(k, j)
+    return tuple(pairs)
+
+
 # =============================================================================
 # GLYCAN TYPES AND COMPOSITIONS
 # =============================================================================
 
-@dataclass
+@dataclass(frozen=True)
 class GlycanComposition:
-    """Represents a glycan composition."""
+    """Represents a glycan composition. Immutable once constructed."""
+    # Manual __slots__ (dataclass slots=True needs 3.10+): drops the
+    # per-instance __dict__ for large enumerated glycan libraries
+    __slots__ = ('name', 'composition', 'mass', 'glycan_type')
+
     name: str
     composition: Dict[str, int]  # monosaccharide -> count
     mass: float
@@ -74,17 +137,18 @@ class GlycanComposition:
             "HexNAc2Hex3" -> {HexNAc: 2, Hex: 3}
             "HexNAc4Hex5Fuc1NeuAc2" -> {HexNAc: 4, Hex: 5, Fuc: 1, NeuAc: 2}
         """
-        composition = {}
-        pattern = r'([A-Za-z]+)(\d+)'
-
-        for match in re.finditer(pattern, comp_string):
-            mono = match.group(1)
-            count = int(match.group(2))
-            if mono in MONOSACCHARIDE_MASSES:
-                composition[mono] = count
-
-        mass = sum(MONOSACCHARIDE_MASSES[mono] * count
-                   for mono, count in composition.items())
+        parsed = _parse_composition(comp_string)
+        # dict() keeps the last count for a repeated name; sum the mass
+        # over the same deduplicated items so the two never disagree
+        composition = dict(parsed)
+
+        if composition:
+            idx = [_MONO_IDX[mono] for mono in composition]
+            counts = np.fromiter(
+                composition.values(), dtype=np.float64, count=len(composition))
+            mass = float(_MONO_VEC[idx] @ counts)
+        else:
+            mass = 0.0
 
         return cls(
             name=name or comp_string,
@@ -100,34 +164,45 @@ class GlycanComposition:
 # Core structures: Core 1-4
 # =============================================================================
 
+def _glycan(name: str, composition: Dict[str, int], glycan_type: str) -> GlycanComposition:
+    """Build a library entry with its mass computed from the composition.
+
+    Keeps the composition dict as the single source of truth: the masses
+    below used to be hand-entered alongside it with nothing enforcing
+    agreement. Runs once per entry at module import.
+    """
+    mass = float(sum(MONOSACCHARIDE_MASSES[m] * c for m, c in composition.items()))
+    return GlycanComposition(name, composition, mass, glycan_type)
+
+
 O_GLYCAN_COMPOSITIONS = {
     # -------------------------------------------------------------------------
     # Simple O-GlcNAc/O-GalNAc (Tn antigen)
     # -------------------------------------------------------------------------
-    'O-GlcNAc': GlycanComposition('O-GlcNAc', {'HexNAc': 1}, 203.0794, 'O-GlcNAc'),
-    'O-GalNAc': GlycanComposition('O-GalNAc', {'HexNAc': 1}, 203.0794, 'O-GalNAc'),
-    'Tn': GlycanComposition('Tn', {'HexNAc': 1}, 203.0794, 'O-glycan'),
+    'O-GlcNAc': _glycan('O-GlcNAc', {'HexNAc': 1}, 'O-GlcNAc'),
+    'O-GalNAc': _glycan('O-GalNAc', {'HexNAc': 1}, 'O-GalNAc'),
+    'Tn': _glycan('Tn', {'HexNAc': 1}, 'O-glycan'),
 
     # -------------------------------------------------------------------------
     # Core 1 structures (T antigen): Galβ1-3GalNAc
     # -------------------------------------------------------------------------
-    'Core1': GlycanComposition('Core1', {'HexNAc': 1, 'Hex': 1}, 365.1322, 'O-glycan'),
-    'T-antigen': GlycanComposition('T-antigen', {'HexNAc': 1, 'Hex': 1}, 365.1322, 'O-glycan'),
+    'Core1': _glycan('Core1', {'HexNAc': 1, 'Hex': 1}, 'O-glycan'),
+    'T-antigen': _glycan('T-antigen', {'HexNAc': 1, 'Hex': 1}, 'O-glycan'),
 
     # -------------------------------------------------------------------------
     # Core 2 structures: Galβ1-3(GlcNAcβ1-6)GalNAc
     # -------------------------------------------------------------------------
-    'Core2': GlycanComposition('Core2', {'HexNAc': 2, 'Hex': 1}, 568.2116, 'O-glycan'),
+    'Core2': _glycan('Core2', {'HexNAc': 2, 'Hex': 1}, 'O-glycan'),
 
     # -------------------------------------------------------------------------
     # Core 3 structures: GlcNAcβ1-3GalNAc
     # -------------------------------------------------------------------------
-    'Core3': GlycanComposition('Core3', {'HexNAc': 2}, 406.1588, 'O-glycan'),
+    'Core3': _glycan('Core3', {'HexNAc': 2}, 'O-glycan'),
 
     # -------------------------------------------------------------------------
     # Core 4 structures: GlcNAcβ1-3(GlcNAcβ1-6)GalNAc
     # -------------------------------------------------------------------------
-    'Core4': GlycanComposition('Core4', {'HexNAc': 3}, 609.2382, 'O-glycan'),
+    'Core4': _glycan('Core4', {'HexNAc': 3}, 'O-glycan'),
 
     # -------------------------------------------------------------------------
     # MSFragger Human O-glycan database (12 common structures)
@@ -139,77 +214,122 @@ O_GLYCAN_COMPOSITIONS = {
     # 2. HexNAc(1)Hex(1) - T antigen / Core 1 (already defined above)
 
     # 3. HexNAc(1)NeuAc(1) - Sialyl-Tn
-    'HexNAc1NeuAc1': GlycanComposition('Sialyl-Tn', {'HexNAc': 1, 'NeuAc': 1}, 494.1748, 'O-glycan'),
-    'Sialyl-Tn': GlycanComposition('Sialyl-Tn', {'HexNAc': 1, 'NeuAc': 1}, 494.1748, 'O-glycan'),
+    'HexNAc1NeuAc1': _glycan('Sialyl-Tn', {'HexNAc': 1, 'NeuAc': 1}, 'O-glycan'),
+    'Sialyl-Tn': _glycan('Sialyl-Tn', {'HexNAc': 1, 'NeuAc': 1}, 'O-glycan'),
 
     # 4. HexNAc(2)Hex(1) - Core 2 (already defined above)
 
     # 5. HexNAc(1)Hex(1)NeuAc(1) - Sialyl-T / Sialyl-Core1
-    'HexNAc1Hex1NeuAc1': GlycanComposition('Sialyl-T', {'HexNAc': 1, 'Hex': 1, 'NeuAc': 1}, 656.2276, 'O-glycan'),
-    'Sialyl-T': GlycanComposition('Sialyl-T', {'HexNAc': 1, 'Hex': 1, 'NeuAc': 1}, 656.2276, 'O-glycan'),
-    'Sialyl-Core1': GlycanComposition('Sialyl-Core1', {'HexNAc': 1, 'Hex': 1, 'NeuAc': 1}, 656.2276, 'O-glycan'),
+    'HexNAc1Hex1NeuAc1': _glycan('Sialyl-T', {'HexNAc': 1, 'Hex': 1, 'NeuAc': 1}, 'O-glycan'),
+    'Sialyl-T': _glycan('Sialyl-T', {'HexNAc': 1, 'Hex': 1, 'NeuAc': 1}, 'O-glycan'),
+    'Sialyl-Core1': _glycan('Sialyl-Core1', {'HexNAc': 1, 'Hex': 1, 'NeuAc': 1}, 'O-glycan'),
 
     # 6. HexNAc(2)Hex(2) - Extended Core 1 or Core 2
-    'HexNAc2Hex2': GlycanComposition('HexNAc2Hex2', {'HexNAc': 2, 'Hex': 2}, 730.2644, 'O-glycan'),
+    'HexNAc2Hex2': _glycan('HexNAc2Hex2', {'HexNAc': 2, 'Hex': 2}, 'O-glycan'),
 
     # 7. HexNAc(2)Hex(1)NeuAc(1) - Sialylated Core 2
-    'HexNAc2Hex1NeuAc1': GlycanComposition('HexNAc2Hex1NeuAc1', {'HexNAc': 2, 'Hex': 1, 'NeuAc': 1}, 859.3070, 'O-glycan'),
+    'HexNAc2Hex1NeuAc1': _glycan('HexNAc2Hex1NeuAc1', {'HexNAc': 2, 'Hex': 1, 'NeuAc': 1}, 'O-glycan'),
 
     # 8. HexNAc(1)Hex(1)NeuAc(2) - Disialyl-T
-    'HexNAc1Hex1NeuAc2': GlycanComposition('Disialyl-T', {'HexNAc': 1, 'Hex': 1, 'NeuAc': 2}, 947.3230, 'O-glycan'),
-    'Disialyl-T': GlycanComposition('Disialyl-T', {'HexNAc': 1, 'Hex': 1, 'NeuAc': 2}, 947.3230, 'O-glycan'),
+    'HexNAc1Hex1NeuAc2': _glycan('Disialyl-T', {'HexNAc': 1, 'Hex': 1, 'NeuAc': 2}, 'O-glycan'),
+    'Disialyl-T': _glycan('Disialyl-T', {'HexNAc': 1, 'Hex': 1, 'NeuAc': 2}, 'O-glycan'),
 
     # 9. HexNAc(2)Hex(2)NeuAc(1) - Monosialylated extended
-    'HexNAc2Hex2NeuAc1': GlycanComposition('HexNAc2Hex2NeuAc1', {'HexNAc': 2, 'Hex': 2, 'NeuAc': 1}, 1021.3598, 'O-glycan'),
+    'HexNAc2Hex2NeuAc1': _glycan('HexNAc2Hex2NeuAc1', {'HexNAc': 2, 'Hex': 2, 'NeuAc': 1}, 'O-glycan'),
 
     # 10. HexNAc(2)Hex(2)Fuc(1)NeuAc(1) - Fucosylated monosialylated
-    'HexNAc2Hex2Fuc1NeuAc1': GlycanComposition('HexNAc2Hex2Fuc1NeuAc1', {'HexNAc': 2, 'Hex': 2, 'Fuc': 1, 'NeuAc': 1}, 1167.4177, 'O-glycan'),
+    'HexNAc2Hex2Fuc1NeuAc1': _glycan('HexNAc2Hex2Fuc1NeuAc1', {'HexNAc': 2, 'Hex': 2, 'Fuc': 1, 'NeuAc': 1}, 'O-glycan'),
 
     # 11. HexNAc(2)Hex(2)NeuAc(2) - Disialylated extended
-    'HexNAc2Hex2NeuAc2': GlycanComposition('HexNAc2Hex2NeuAc2', {'HexNAc': 2, 'Hex': 2, 'NeuAc': 2}, 1312.4552, 'O-glycan'),
+    'HexNAc2Hex2NeuAc2': _glycan('HexNAc2Hex2NeuAc2', {'HexNAc': 2, 'Hex': 2, 'NeuAc': 2}, 'O-glycan'),
 
     # 12. HexNAc(2)Hex(2)Fuc(1)NeuAc(2) - Fucosylated disialylated
-    'HexNAc2Hex2Fuc1NeuAc2': GlycanComposition('HexNAc2Hex2Fuc1NeuAc2', {'HexNAc': 2, 'Hex': 2, 'Fuc': 1, 'NeuAc': 2}, 1458.5131, 'O-glycan'),
+    'HexNAc2Hex2Fuc1NeuAc2': _glycan('HexNAc2Hex2Fuc1NeuAc2', {'HexNAc': 2, 'Hex': 2, 'Fuc': 1, 'NeuAc': 2}, 'O-glycan'),
 
     # -------------------------------------------------------------------------
     # Additional common O-glycans with NeuGc (non-human, but for completeness)
     # -------------------------------------------------------------------------
-    'HexNAc1NeuGc1': GlycanComposition('HexNAc1NeuGc1', {'HexNAc': 1, 'NeuGc': 1}, 510.1697, 'O-glycan'),
-    'HexNAc1Hex1NeuGc1': GlycanComposition('HexNAc1Hex1NeuGc1', {'HexNAc': 1, 'Hex': 1, 'NeuGc': 1}, 672.2225, 'O-glycan'),
+    'HexNAc1NeuGc1': _glycan('HexNAc1NeuGc1', {'HexNAc': 1, 'NeuGc': 1}, 'O-glycan'),
+    'HexNAc1Hex1NeuGc1': _glycan('HexNAc1Hex1NeuGc1', {'HexNAc': 1, 'Hex': 1, 'NeuGc': 1}, 'O-glycan'),
 
     # -------------------------------------------------------------------------
     # Phosphorylated and Sulfated O-glycans (common in your lab's data)
     # -------------------------------------------------------------------------
-    'HexNAc1-Phosphate': GlycanComposition('HexNAc1-Phosphate', {'HexNAc': 1, 'Phosphate': 1}, 283.0457, 'O-glycan'),
-    'HexNAc1Hex1-Phosphate': GlycanComposition('HexNAc1Hex1-Phosphate', {'HexNAc': 1, 'Hex': 1, 'Phosphate': 1}, 445.0985, 'O-glycan'),
-    'HexNAc1-Sulfate': GlycanComposition('HexNAc1-Sulfate', {'HexNAc': 1, 'Sulfate': 1}, 283.0362, 'O-glycan'),
-    'HexNAc1Hex1-Sulfate': GlycanComposition('HexNAc1Hex1-Sulfate', {'HexNAc': 1, 'Hex': 1, 'Sulfate': 1}, 445.0890, 'O-glycan'),
-    'HexNAc2Hex2-Sulfate': GlycanComposition('HexNAc2Hex2-Sulfate', {'HexNAc': 2, 'Hex': 2, 'Sulfate': 1}, 810.2212, 'O-glycan'),
+    'HexNAc1-Phosphate': _glycan('HexNAc1-Phosphate', {'HexNAc': 1, 'Phosphate': 1}, 'O-glycan'),
+    'HexNAc1Hex1-Phosphate': _glycan('HexNAc1Hex1-Phosphate', {'HexNAc': 1, 'Hex': 1, 'Phosphate': 1}, 'O-glycan'),
+    'HexNAc1-Sulfate': _glycan('HexNAc1-Sulfate', {'HexNAc': 1, 'Sulfate': 1}, 'O-glycan'),
+    'HexNAc1Hex1-Sulfate': _glycan('HexNAc1Hex1-Sulfate', {'HexNAc': 1, 'Hex': 1, 'Sulfate': 1}, 'O-glycan'),
+    'HexNAc2Hex2-Sulfate': _glycan('HexNAc2Hex2-Sulfate', {'HexNAc': 2, 'Hex': 2, 'Sulfate': 1}, 'O-glycan'),
 }
 
 # Common N-glycan compositions
 N_GLYCAN_COMPOSITIONS = {
     # Trimannosyl core (all N-glycans share this)
-    'Core': GlycanComposition('N-glycan Core', {'HexNAc': 2, 'Hex': 3}, 892.3170, 'N-glycan'),
+    'Core': _glycan('N-glycan Core', {'HexNAc': 2, 'Hex': 3}, 'N-glycan'),
 
     # High-mannose series
-    'Man5': GlycanComposition('Man5', {'HexNAc': 2, 'Hex': 5}, 1216.4226, 'N-glycan'),
-    'Man6': GlycanComposition('Man6', {'HexNAc': 2, 'Hex': 6}, 1378.4754, 'N-glycan'),
-    'Man7': GlycanComposition('Man7', {'HexNAc': 2, 'Hex': 7}, 1540.5282, 'N-glycan'),
-    'Man8': GlycanComposition('Man8', {'HexNAc': 2, 'Hex': 8}, 1702.5810, 'N-glycan'),
-    'Man9': GlycanComposition('Man9', {'HexNAc': 2, 'Hex': 9}, 1864.6338, 'N-glycan'),
+    'Man5': _glycan('Man5', {'HexNAc': 2, 'Hex': 5}, 'N-glycan'),
+    'Man6': _glycan('Man6', {'HexNAc': 2, 'Hex': 6}, 'N-glycan'),
+    'Man7': _glycan('Man7', {'HexNAc': 2, 'Hex': 7}, 'N-glycan'),
+    'Man8': _glycan('Man8', {'HexNAc': 2, 'Hex': 8}, 'N-glycan'),
+    'Man9': _glycan('Man9', {'HexNAc': 2, 'Hex': 9}, 'N-glycan'),
 
     # Complex N-glycans (biantennary)
-    'A2': GlycanComposition('A2', {'HexNAc': 4, 'Hex': 5}, 1622.5814, 'N-glycan'),
-    'A2F': GlycanComposition('A2F', {'HexNAc': 4, 'Hex': 5, 'Fuc': 1}, 1768.6393, 'N-glycan'),
-    'A2G2': GlycanComposition('A2G2', {'HexNAc': 4, 'Hex': 5}, 1622.5814, 'N-glycan'),
-    'A2G2F': GlycanComposition('A2G2F', {'HexNAc': 4, 'Hex': 5, 'Fuc': 1}, 1768.6393, 'N-glycan'),
-    'A2G2S1': GlycanComposition('A2G2S1', {'HexNAc': 4, 'Hex': 5, 'NeuAc': 1}, 1913.6768, 'N-glycan'),
-    'A2G2S2': GlycanComposition('A2G2S2', {'HexNAc': 4, 'Hex': 5, 'NeuAc': 2}, 2204.7722, 'N-glycan'),
-    'A2G2FS1': GlycanComposition('A2G2FS1', {'HexNAc': 4, 'Hex': 5, 'Fuc': 1, 'NeuAc': 1}, 2059.7347, 'N-glycan'),
-    'A2G2FS2': GlycanComposition('A2G2FS2', {'HexNAc': 4, 'Hex': 5, 'Fuc': 1, 'NeuAc': 2}, 2350.8301, 'N-glycan'),
+    'A2': _glycan('A2', {'HexNAc': 4, 'Hex': 5}, 'N-glycan'),
+    'A2F': _glycan('A2F', {'HexNAc': 4, 'Hex': 5, 'Fuc': 1}, 'N-glycan'),
+    'A2G2': _glycan('A2G2', {'HexNAc': 4, 'Hex': 5}, 'N-glycan'),
+    'A2G2F': _glycan('A2G2F', {'HexNAc': 4, 'Hex': 5, 'Fuc': 1}, 'N-glycan'),
+    'A2G2S1': _glycan('A2G2S1', {'HexNAc': 4, 'Hex': 5, 'NeuAc': 1}, 'N-glycan'),
+    'A2G2S2': _glycan('A2G2S2', {'HexNAc': 4, 'Hex': 5, 'NeuAc': 2}, 'N-glycan'),
+    'A2G2FS1': _glycan('A2G2FS1', {'HexNAc': 4, 'Hex': 5, 'Fuc': 1, 'NeuAc': 1}, 'N-glycan'),
+    'A2G2FS2': _glycan('A2G2FS2', {'HexNAc': 4, 'Hex': 5, 'Fuc': 1, 'NeuAc': 2}, 'N-glycan'),
 }
 
+# Intern alias entries (e.g. Core1 / T-antigen, A2 / A2G2) so each
+# distinct (composition, type) pair is backed by one shared instance
+# instead of duplicate allocations per alternate name
+def _intern_glycan_aliases(compositions: Dict[str, GlycanComposition]) -> None:
+    canonical: Dict[Tuple, GlycanComposition] = {}
+    for name, glycan in compositions.items():
+        key = (tuple(sorted(glycan.composition.items())), glycan.glycan_type)
+        compositions[name] = canonical.setdefault(key, glycan)
+
+
+_intern_glycan_aliases(O_GLYCAN_COMPOSITIONS)
+_intern_glycan_aliases(N_GLYCAN_COMPOSITIONS)
+
+# Read-only views: these registries back precomputed arrays below, so
+# mutating them after import would silently desynchronize the caches
+O_GLYCAN_COMPOSITIONS = MappingProxyType(O_GLYCAN_COMPOSITIONS)
+N_GLYCAN_COMPOSITIONS = MappingProxyType(N_GLYCAN_COMPOSITIONS)
+
+# Ordered glycan name tuples, frozen once at import for UI option lists
+O_GLYCAN_NAMES: Tuple[str, ...] = tuple(O_GLYCAN_COMPOSITIONS)
+N_GLYCAN_NAMES: Tuple[str, ...] = tuple(N_GLYCAN_COMPOSITIONS)
+
+# Parallel glycan/mass arrays for vectorized mass lookups: one C-level
+# scan over contiguous float64 instead of a Python loop per query
+_O_GLYCANS: Tuple[GlycanComposition, ...] = tuple(O_GLYCAN_COMPOSITIONS.values())
+_N_GLYCANS: Tuple[GlycanComposition, ...] = tuple(N_GLYCAN_COMPOSITIONS.values())
+_O_MASSES = np.fromiter(
+    (g.mass for g in _O_GLYCANS), dtype=np.float64, count=len(_O_GLYCANS)
+)
+_N_MASSES = np.fromiter(
+    (g.mass for g in _N_GLYCANS), dtype=np.float64, count=len(_N_GLYCANS)
+)
+_ALL_NAMES: Tuple[str, ...] = O_GLYCAN_NAMES + N_GLYCAN_NAMES
+_ALL_GLYCANS: Tuple[GlycanComposition, ...] = _O_GLYCANS + _N_GLYCANS
+_ALL_MASSES = np.concatenate([_O_MASSES, _N_MASSES])
+
+# Sorted copies (plus the permutation back to library order) so batch
+# queries can bisect tolerance windows instead of scanning
+_O_SORT = np.argsort(_O_MASSES)
+_N_SORT = np.argsort(_N_MASSES)
+_ALL_SORT = np.argsort(_ALL_MASSES)
+_O_MASSES_SORTED = _O_MASSES[_O_SORT]
+_N_MASSES_SORTED = _N_MASSES[_N_SORT]
+_ALL_MASSES_SORTED = _ALL_MASSES[_ALL_SORT]
+
 # =============================================================================
 # OXONIUM IONS (Glycan Diagnostic B-ions)
 # =============================================================================
@@ -258,30 +378,80 @@ OXONIUM_IONS_EXTENDED = {
     'HexNAc-H2O-TMT': 511.2831,      # [HexNAc - H2O + TMT + H]+
 }
 
+# Canonical oxonium table: one (name, m/z) record per ion, so the
+# subset libraries below are index views instead of duplicated floats.
+# 'HexNAc_126' is the historical alias of HexNAc-C2H6O3 kept for the
+# O-GlcNAc subset.
+OXONIUM_TABLE = np.array(
+    list(OXONIUM_IONS_EXTENDED.items()) + [('HexNAc_126', 126.0550)],
+    dtype=[('name', 'U24'), ('mz', 'f8')],
+)
+_OXONIUM_ROW = {name: i for i, name in enumerate(OXONIUM_TABLE['name'])}
+
+
+def _oxonium_subset(names: Tuple[str, ...]):
+    """Index array into OXONIUM_TABLE plus the matching read-only dict."""
+    idx = np.array([_OXONIUM_ROW[n] for n in names], dtype=np.uint16)
+    view = MappingProxyType({n: float(OXONIUM_TABLE['mz'][_OXONIUM_ROW[n]]) for n in names})
+    return idx, view
+
+
 # Subset for O-GlcNAc/O-GalNAc analysis
-OXONIUM_IONS_O_GLCNAC = {
-    'HexNAc': 204.0867,
-    'HexNAc-H2O': 186.0761,
-    'HexNAc-2H2O': 168.0655,
-    'HexNAc_138': 138.0550,
-    'HexNAc_126': 126.0550,
-    'HexNAc-TMT': 529.2937,
-}
+OXONIUM_IDX_O_GLCNAC, OXONIUM_IONS_O_GLCNAC = _oxonium_subset((
+    'HexNAc', 'HexNAc-H2O', 'HexNAc-2H2O', 'HexNAc_138', 'HexNAc_126', 'HexNAc-TMT',
+))
 
 # Subset for N-glycan analysis
-OXONIUM_IONS_N_GLYCAN = {
-    'HexNAc': 204.0867,
-    'HexNAc-H2O': 186.0761,
-    'Hex': 163.0601,
-    'Hex-H2O': 145.0495,
-    'NeuAc': 292.1027,
-    'NeuAc-H2O': 274.0921,
-    'Fuc': 147.0652,
-    'HexNAc-Hex': 366.1395,
-    'HexNAc-Hex-H2O': 348.1289,
-    'HexNAc-NeuAc': 495.1821,
-    'HexNAc-Hex-NeuAc': 657.2349,
-}
+OXONIUM_IDX_N_GLYCAN, OXONIUM_IONS_N_GLYCAN = _oxonium_subset((
+    'HexNAc', 'HexNAc-H2O', 'Hex', 'Hex-H2O', 'NeuAc', 'NeuAc-H2O', 'Fuc',
+    'HexNAc-Hex', 'HexNAc-Hex-H2O', 'HexNAc-NeuAc', 'HexNAc-Hex-NeuAc',
+))
+
+# Read-only view over the extended registry as well
+OXONIUM_IONS_EXTENDED = MappingProxyType(OXONIUM_IONS_EXTENDED)
+
+# Sorted m/z view of the full table (plus the permutation back to row
+# order) so peak matching can bisect instead of scanning the dict
+_OXONIUM_MZ_SORT = np.argsort(OXONIUM_TABLE['mz'])
+_OXONIUM_MZ_SORTED = OXONIUM_TABLE['mz'][_OXONIUM_MZ_SORT]
+
+
+def match_oxonium_ions(
+    peak_mzs,
+    tolerance_da: float = 0.01
+) -> List[Optional[Tuple[str, float, float]]]:
+    """
+    Match experimental peaks against the oxonium table by bisection.
+
+    One searchsorted over the sorted m/z array handles a whole peak
+    list at once instead of a Python loop over dict items per peak.
+
+    Args:
+        peak_mzs: Array-like of experimental m/z values
+        tolerance_da: Match tolerance in Daltons
+
+    Returns:
+        List parallel to the input: (name, theoretical_mz, error_da)
+        for matched peaks, None otherwise
+    """
+    mz = np.atleast_1d(np.asarray(peak_mzs, dtype=np.float64))
+    hi = len(_OXONIUM_MZ_SORTED) - 1
+
+    # Nearest sorted neighbor of every peak
+    pos = np.searchsorted(_OXONIUM_MZ_SORTED, mz)
+    left = np.clip(pos - 1, 0, hi)
+    right = np.clip(pos, 0, hi)
+    use_right = (np.abs(_OXONIUM_MZ_SORTED[right] - mz)
+                 < np.abs(_OXONIUM_MZ_SORTED[left] - mz))
+    nearest = np.where(use_right, right, left)
+
+    errors = mz - _OXONIUM_MZ_SORTED[nearest]
+    rows = _OXONIUM_MZ_SORT[nearest]
+    return [
+        (str(OXONIUM_TABLE['name'][r]), float(OXONIUM_TABLE['mz'][r]), float(e))
+        if abs(e) <= tolerance_da else None
+        for r, e in zip(rows, errors)
+    ]
 
 # =============================================================================
 # Y ION SERIES GENERATION
@@ -312,67 +482,151 @@ def generate_y_ion_series(
     Returns:
         Dictionary of Y ion names to neutral masses
     """
-    y_ions = {}
     glycan_mass = glycan.mass
 
     if tmt_on_glycan:
         glycan_mass += tmt_mass
 
+    # Quantize the float key (1e-6 Da, far below any matching tolerance)
+    # so repeated (peptide, glycan) pairs hit the cache
+    pairs = _y_ion_series_cached(
+        round(glycan_mass, 6),
+        glycan.glycan_type,
+        tuple(sorted(glycan.composition.items())),
+        round(peptide_mass, 6),
+        include_water_loss,
+    )
+    return dict(pairs)
+
+
+@lru_cache(maxsize=65536)
+def _y_ion_series_cached(
+    glycan_mass: float,
+    glycan_type: str,
+    comp_tuple: Tuple[Tuple[str, int], ...],
+    peptide_mass: float,
+    include_water_loss: bool,
+) -> Tuple[Tuple[str, float], ...]:
+    """Memoized core of generate_y_ion_series, keyed on hashable inputs."""
+    y_ions = {}
+
     # Y0 - peptide only (complete glycan loss)
     y_ions['Y0'] = peptide_mass
-    if include_water_loss:
-        y_ions['Y0-H2O'] = peptide_mass - 18.0106
 
     # For simple O-glycans (single monosaccharide)
-    if glycan.glycan_type in ['O-GlcNAc', 'O-GalNAc']:
+    if glycan_type in ['O-GlcNAc', 'O-GalNAc']:
         # Y1 = intact glycopeptide
         y_ions['Y1'] = peptide_mass + glycan_mass
         if include_water_loss:
-            y_ions['Y1-H2O'] = peptide_mass + glycan_mass - 18.0106
+            y_ions['Y0-H2O'] = peptide_mass - _H2O
+            y_ions['Y1-H2O'] = peptide_mass + glycan_mass - _H2O
 
     # For complex O-glycans and N-glycans
     else:
-        comp = glycan.composition
+        comp = dict(comp_tuple)
 
-        # Build Y ion ladder based on composition
-        # Strategy: remove monosaccharides one at a time from non-reducing end
-
-        # Y ions by number of monosaccharides attached
-        total_mono = sum(comp.values())
+        # Unpack the counts once: each .get is a dict probe, and the
+        # conditionals below would otherwise repeat them
+        n_hexnac = comp.get('HexNAc', 0)
+        n_hex = comp.get('Hex', 0)
+        n_fuc = comp.get('Fuc', 0)
 
-        for i in range(1, total_mono + 1):
-            # Generate representative Y ions
-            # This is a simplified model - full implementation would track topology
+        # Build Y ion ladder based on composition
+        # This is a simplified model - full implementation would track topology.
+        # Each representative ion is emitted at most once, so plain
+        # conditionals suffice; no per-monosaccharide loop is needed.
 
-            if i == 1 and 'HexNAc' in comp:
-                # Y1 = peptide + 1 HexNAc (reducing end)
-                y_ions[f'Y1'] = peptide_mass + MONOSACCHARIDE_MASSES['HexNAc']
+        if n_hexnac >= 1:
+            # Y1 = peptide + 1 HexNAc (reducing end)
+            y_ions['Y1'] = peptide_mass + _M_HEXNAC
 
-            if i == 2 and comp.get('HexNAc', 0) >= 2:
-                # Y2 = peptide + 2 HexNAc (chitobiose core for N-glycans)
-                y_ions[f'Y2'] = peptide_mass + 2 * MONOSACCHARIDE_MASSES['HexNAc']
+        if n_hexnac >= 2:
+            # Y2 = peptide + 2 HexNAc (chitobiose core for N-glycans)
+            y_ions['Y2'] = peptide_mass + 2 * _M_HEXNAC
 
-            # For N-glycans, add core structure Y ions
-            if glycan.glycan_type == 'N-glycan':
-                # Trimannosyl core
-                if comp.get('HexNAc', 0) >= 2 and comp.get('Hex', 0) >= 3:
-                    core_mass = 2 * MONOSACCHARIDE_MASSES['HexNAc'] + 3 * MONOSACCHARIDE_MASSES['Hex']
-                    y_ions['Y(core)'] = peptide_mass + core_mass
+        # For N-glycans, add core structure Y ions (trimannosyl core)
+        if glycan_type == 'N-glycan' and n_hexnac >= 2 and n_hex >= 3:
+            core_mass = 2 * _M_HEXNAC + 3 * _M_HEX
+            y_ions['Y(core)'] = peptide_mass + core_mass
 
-                    # Add fucose to core if present
-                    if comp.get('Fuc', 0) >= 1:
-                        y_ions['Y(core+F)'] = peptide_mass + core_mass + MONOSACCHARIDE_MASSES['Fuc']
+            # Add fucose to core if present
+            if n_fuc >= 1:
+                y_ions['Y(core+F)'] = peptide_mass + core_mass + _M_FUC
 
         # Y(intact) = full glycopeptide
         y_ions['Y(intact)'] = peptide_mass + glycan_mass
 
-        # Add water loss variants for major Y ions
+        # Add water loss variants for major Y ions: every key present at
+        # this point is a primary ion, so shift all masses in one
+        # vectorized pass with no endswith filtering
         if include_water_loss:
-            for name, mass in list(y_ions.items()):
-                if not name.endswith('-H2O'):
-                    y_ions[f'{name}-H2O'] = mass - 18.0106
+            names = list(y_ions)
+            masses = np.fromiter(
+                y_ions.values(), dtype=np.float64, count=len(names)
+            )
+            y_ions.update(zip([n + '-H2O' for n in names], (masses - _H2O).tolist()))
 
-    return y_ions
+    return tuple(y_ions.items())
+
+
+def _build_n_glycan_y_ion_table():
+    """Precompute the N-glycan Y-ion table as parallel arrays.
+
+    Each row is a candidate Y ion: its (HexNAc, Hex, Fuc, NeuAc)
+    coefficients, the minimum composition required to emit it, and
+    whether it is a fucose variant (gated by include_fucose_variants).
+    """
+    # name, glycan coefficients, minimum required composition
+    base = [
+        ('Y0',            (0, 0, 0, 0), (0, 0, 0, 0)),
+        ('Y1',            (1, 0, 0, 0), (1, 0, 0, 0)),
+        ('Y2',            (2, 0, 0, 0), (2, 0, 0, 0)),
+        ('Y3',            (2, 1, 0, 0), (2, 1, 0, 0)),
+        ('Y4',            (2, 2, 0, 0), (2, 2, 0, 0)),
+        ('Y(core)',       (2, 3, 0, 0), (2, 3, 0, 0)),
+        ('Y(core+1arm)',  (3, 4, 0, 0), (3, 3, 0, 0)),
+        ('Y(bi)',         (4, 5, 0, 0), (4, 5, 0, 0)),
+    ]
+
+    rows = []
+    for name, coeff, req in base:
+        rows.append((name, coeff, req, False))
+        if name != 'Y0':
+            # Fucosylated variant: +1 Fuc on both mass and requirement
+            rows.append((
+                name + 'F',
+                (coeff[0], coeff[1], coeff[2] + 1, coeff[3]),
+                (req[0], req[1], req[2] + 1, req[3]),
+                True,
+            ))
+
+    # Sialylated variants of the core/antenna ions (S1 then S2 blocks,
+    # matching the original insertion order)
+    sialyl_bases = [r for r in rows if 'core' in r[0] or 'bi' in r[0]]
+    for n_sia in (1, 2):
+        for name, coeff, req, fuc_variant in sialyl_bases:
+            rows.append((
+                f'{name}S{n_sia}',
+                (coeff[0], coeff[1], coeff[2], coeff[3] + n_sia),
+                (req[0], req[1], req[2], req[3] + n_sia),
+                fuc_variant,
+            ))
+
+    names = tuple(r[0] for r in rows)
+    coeff = np.array([r[1] for r in rows], dtype=np.float64)
+    req = np.array([r[2] for r in rows], dtype=np.int64)
+    fuc_variant = np.array([r[3] for r in rows], dtype=bool)
+    return names, coeff, req, fuc_variant
+
+
+_NGLYCAN_SUGAR_MASSES = np.array(
+    [MONOSACCHARIDE_MASSES[k] for k in ('HexNAc', 'Hex', 'Fuc', 'NeuAc')],
+    dtype=np.float64,
+)
+(_NGLYCAN_YION_NAMES, _NGLYCAN_YION_COEFF,
+ _NGLYCAN_YION_REQ, _NGLYCAN_YION_FUC) = _build_n_glycan_y_ion_table()
+# Glycan mass of every candidate Y ion, computed once as a matvec
+_NGLYCAN_YION_MASSES = _NGLYCAN_YION_COEFF @ _NGLYCAN_SUGAR_MASSES
 
 
 def generate_n_glycan_y_ions(
@@ -395,80 +649,90 @@ def generate_n_glycan_y_ions(
     Returns:
         Dictionary of Y ion names to neutral masses
     """
-    y_ions = {}
+    pairs = _n_glycan_y_ions_cached(
+        (
+            glycan_composition.get('HexNAc', 0),
+            glycan_composition.get('Hex', 0),
+            glycan_composition.get('Fuc', 0),
+            glycan_composition.get('NeuAc', 0),
+        ),
+        round(peptide_mass, 6),
+        include_fucose_variants,
+    )
+    return dict(pairs)
+
+
+@lru_cache(maxsize=65536)
+def _n_glycan_y_ions_cached(
+    counts_tuple: Tuple[int, int, int, int],
+    peptide_mass: float,
+    include_fucose_variants: bool,
+) -> Tuple[Tuple[str, float], ...]:
+    """Memoized core of generate_n_glycan_y_ions."""
+    counts = np.array(counts_tuple, dtype=np.int64)
+
+    # Select the table rows this composition can produce with one
+    # vectorized requirement check instead of the old if-ladder
+    valid = np.all(counts >= _NGLYCAN_YION_REQ, axis=1)
+    if not include_fucose_variants:
+        valid &= ~_NGLYCAN_YION_FUC
+
+    masses = peptide_mass + _NGLYCAN_YION_MASSES
+    y_ions = {
+        name: float(mass)
+        for name, mass, ok in zip(_NGLYCAN_YION_NAMES, masses, valid)
+        if ok
+    }
 
-    n_hexnac = glycan_composition.get('HexNAc', 0)
-    n_hex = glycan_composition.get('Hex', 0)
-    n_fuc = glycan_composition.get('Fuc', 0)
-    n_neuac = glycan_composition.get('NeuAc', 0)
+    # Full glycopeptide
+    y_ions['Y(intact)'] = peptide_mass + float(counts @ _NGLYCAN_SUGAR_MASSES)
 
-    hex_mass = MONOSACCHARIDE_MASSES['Hex']
-    hexnac_mass = MONOSACCHARIDE_MASSES['HexNAc']
-    fuc_mass = MONOSACCHARIDE_MASSES['Fuc']
-    neuac_mass = MONOSACCHARIDE_MASSES['NeuAc']
+    return tuple(y_ions.items())
 
-    # Y0 - peptide only
-    y_ions['Y0'] = peptide_mass
 
-    # Y1 - peptide + 1 HexNAc (reducing end GlcNAc)
-    if n_hexnac >= 1:
-        y_ions['Y1'] = peptide_mass + hexnac_mass
-        if n_fuc >= 1 and include_fucose_variants:
-            y_ions['Y1F'] = peptide_mass + hexnac_mass + fuc_mass
-
-    # Y2 - peptide + chitobiose (2 HexNAc)
-    if n_hexnac >= 2:
-        y_ions['Y2'] = peptide_mass + 2 * hexnac_mass
-        if n_fuc >= 1 and include_fucose_variants:
-            y_ions['Y2F'] = peptide_mass + 2 * hexnac_mass + fuc_mass
-
-    # Y3 - peptide + chitobiose + 1 Man
-    if n_hexnac >= 2 and n_hex >= 1:
-        y_ions['Y3'] = peptide_mass + 2 * hexnac_mass + hex_mass
-        if n_fuc >= 1 and include_fucose_variants:
-            y_ions['Y3F'] = peptide_mass + 2 * hexnac_mass + hex_mass + fuc_mass
-
-    # Y4 - peptide + chitobiose + 2 Man
-    if n_hexnac >= 2 and n_hex >= 2:
-        y_ions['Y4'] = peptide_mass + 2 * hexnac_mass + 2 * hex_mass
-        if n_fuc >= 1 and include_fucose_variants:
-            y_ions['Y4F'] = peptide_mass + 2 * hexnac_mass + 2 * hex_mass + fuc_mass
-
-    # Y(core) - trimannosyl core (HexNAc2Hex3)
-    if n_hexnac >= 2 and n_hex >= 3:
-        core_mass = 2 * hexnac_mass + 3 * hex_mass
-        y_ions['Y(core)'] = peptide_mass + core_mass
-        if n_fuc >= 1 and include_fucose_variants:
-            y_ions['Y(core)F'] = peptide_mass + core_mass + fuc_mass
-
-    # For complex N-glycans, add antenna Y ions
-    if n_hexnac >= 3 and n_hex >= 3:
-        # One antenna
-        y_ions['Y(core+1arm)'] = peptide_mass + 3 * hexnac_mass + 4 * hex_mass
-        if n_fuc >= 1 and include_fucose_variants:
-            y_ions['Y(core+1arm)F'] = peptide_mass + 3 * hexnac_mass + 4 * hex_mass + fuc_mass
-
-    if n_hexnac >= 4 and n_hex >= 5:
-        # Both antennae (biantennary)
-        y_ions['Y(bi)'] = peptide_mass + 4 * hexnac_mass + 5 * hex_mass
-        if n_fuc >= 1 and include_fucose_variants:
-            y_ions['Y(bi)F'] = peptide_mass + 4 * hexnac_mass + 5 * hex_mass + fuc_mass
-
-    # Add sialylated variants
-    if n_neuac >= 1:
-        # Add NeuAc to major Y ions
-        for name, mass in list(y_ions.items()):
-            if 'core' in name or 'bi' in name:
-                y_ions[f'{name}S1'] = mass + neuac_mass
-        if n_neuac >= 2:
-            for name, mass in list(y_ions.items()):
-                if ('core' in name or 'bi' in name) and 'S' not in name:
-                    y_ions[f'{name}S2'] = mass + 2 * neuac_mass
+def generate_n_glycan_y_ions_batch(
+    glycan_composition: Dict[str, int],
+    peptide_masses,
+    include_fucose_variants: bool = True
+) -> Dict[str, np.ndarray]:
+    """
+    Batch version of generate_n_glycan_y_ions for many peptide masses.
+
+    Scoring runs typically reuse one glycan composition across every
+    PSM, so the row selection happens once and each Y ion name maps to
+    an array of neutral masses - one broadcast add per ion instead of
+    a dict build per peptide.
+
+    Args:
+        glycan_composition: Dict of monosaccharide counts
+        peptide_masses: Array-like of peptide backbone masses
+        include_fucose_variants: Include +/- Fuc variants
+
+    Returns:
+        Dictionary of Y ion names to mass arrays parallel to the input
+    """
+    counts = np.array(
+        (
+            glycan_composition.get('HexNAc', 0),
+            glycan_composition.get('Hex', 0),
+            glycan_composition.get('Fuc', 0),
+            glycan_composition.get('NeuAc', 0),
+        ),
+        dtype=np.int64,
+    )
+    pep = np.asarray(peptide_masses, dtype=np.float64)
+
+    valid = np.all(counts >= _NGLYCAN_YION_REQ, axis=1)
+    if not include_fucose_variants:
+        valid &= ~_NGLYCAN_YION_FUC
+
+    y_ions = {
+        _NGLYCAN_YION_NAMES[i]: pep + _NGLYCAN_YION_MASSES[i]
+        for i in np.nonzero(valid)[0]
+    }
 
     # Full glycopeptide
-    total_mass = (n_hexnac * hexnac_mass + n_hex * hex_mass +
-                  n_fuc * fuc_mass + n_neuac * neuac_mass)
-    y_ions['Y(intact)'] = peptide_mass + total_mass
+    y_ions['Y(intact)'] = pep + float(counts @ _NGLYCAN_SUGAR_MASSES)
 
     return y_ions
 
@@ -493,27 +757,79 @@ def identify_glycan_from_mass(
     Returns:
         List of (name, composition, mass_error) tuples
     """
-    matches = []
+    if glycan_type == 'O-glycan':
+        names, glycans, masses = O_GLYCAN_NAMES, _O_GLYCANS, _O_MASSES
+        sort_idx, masses_sorted = _O_SORT, _O_MASSES_SORTED
+    elif glycan_type == 'N-glycan':
+        names, glycans, masses = N_GLYCAN_NAMES, _N_GLYCANS, _N_MASSES
+        sort_idx, masses_sorted = _N_SORT, _N_MASSES_SORTED
+    else:
+        names, glycans, masses = _ALL_NAMES, _ALL_GLYCANS, _ALL_MASSES
+        sort_idx, masses_sorted = _ALL_SORT, _ALL_MASSES_SORTED
 
-    if glycan_type in ['O-glycan', 'all']:
-        for name, glycan in O_GLYCAN_COMPOSITIONS.items():
-            error = abs(mass - glycan.mass)
-            if error <= tolerance_da:
-                matches.append((name, glycan, error))
+    # Bisect the tolerance window into the presorted mass array, as in
+    # identify_glycans_from_masses, instead of scanning the whole library
+    lo = np.searchsorted(masses_sorted, mass - tolerance_da, side='left')
+    hi = np.searchsorted(masses_sorted, mass + tolerance_da, side='right')
+    # Library order breaks error ties, as the full scan did
+    idx = np.sort(sort_idx[lo:hi])
+    errors = np.abs(masses[idx] - mass)
+    idx = idx[np.argsort(errors, kind='stable')]
 
-    if glycan_type in ['N-glycan', 'all']:
-        for name, glycan in N_GLYCAN_COMPOSITIONS.items():
-            error = abs(mass - glycan.mass)
-            if error <= tolerance_da:
-                matches.append((name, glycan, error))
+    return [(names[i], glycans[i], float(abs(masses[i] - mass))) for i in idx]
+
+
+def identify_glycans_from_masses(
+    masses,
+    tolerance_da: float = 0.1,
+    glycan_type: str = 'all'
+) -> List[List[Tuple[str, GlycanComposition, float]]]:
+    """
+    Batch version of identify_glycan_from_mass.
 
-    return sorted(matches, key=lambda x: x[2])
+    Bisects every observed mass into the sorted library mass array, so a
+    whole spectrum's worth of queries costs O((obs + lib) log lib)
+    instead of one Python scan of the library per mass.
+
+    Args:
+        masses: Iterable/array of observed glycan masses
+        tolerance_da: Mass tolerance in Daltons
+        glycan_type: 'O-glycan', 'N-glycan', or 'all'
+
+    Returns:
+        One list of (name, composition, mass_error) tuples per observed
+        mass, each sorted by mass error
+    """
+    if glycan_type == 'O-glycan':
+        names, glycans = O_GLYCAN_NAMES, _O_GLYCANS
+        sort_idx, masses_sorted = _O_SORT, _O_MASSES_SORTED
+    elif glycan_type == 'N-glycan':
+        names, glycans = N_GLYCAN_NAMES, _N_GLYCANS
+        sort_idx, masses_sorted = _N_SORT, _N_MASSES_SORTED
+    else:
+        names, glycans = _ALL_NAMES, _ALL_GLYCANS
+        sort_idx, masses_sorted = _ALL_SORT, _ALL_MASSES_SORTED
+
+    obs = np.asarray(masses, dtype=np.float64)
+    lo = np.searchsorted(masses_sorted, obs - tolerance_da, side='left')
+    hi = np.searchsorted(masses_sorted, obs + tolerance_da, side='right')
+
+    results = []
+    for mass, start, stop in zip(obs, lo, hi):
+        errors = np.abs(masses_sorted[start:stop] - mass)
+        order = np.argsort(errors)
+        results.append([
+            (names[sort_idx[start + j]], glycans[sort_idx[start + j]], float(errors[j]))
+            for j in order
+        ])
+    return results
 
 
 # =============================================================================
 # HELPER FUNCTIONS
 # =============================================================================
 
+@lru_cache(maxsize=4096)
 def get_glycan_mass(composition_string: str) -> float:
     """
     Calculate mass from composition string.
@@ -524,6 +840,11 @@ def get_glycan_mass(composition_string: str) -> float:
     return glycan.mass
 
 
+# ProForma 2.0 glycan notation, compiled once at import
+_PROFORMA_GLYCAN_RE = re.compile(r'\[Glycan:([A-Za-z0-9]+)\]')
+
+
+@lru_cache(maxsize=4096)
 def parse_proforma_glycan(proforma_string: str) -> Optional[GlycanComposition]:
     """
     Parse ProForma 2.0 glycan notation.
@@ -532,13 +853,38 @@ def parse_proforma_glycan(proforma_string: str) -> Optional[GlycanComposition]:
         "[Glycan:HexNAc1]" -> GlycanComposition for O-GlcNAc
         "[Glycan:HexNAc2Hex5]" -> GlycanComposition for Man5
     """
-    match = re.search(r'\[Glycan:([A-Za-z0-9]+)\]', proforma_string)
-    if match:
-        comp_string = match.group(1)
+    # Fast path: literal scans instead of the regex state machine
+    i = proforma_string.find('[Glycan:')
+    if i == -1:
+        return None
+    j = proforma_string.find(']', i + 8)
+    if j == -1:
+        return None
+    comp_string = proforma_string[i + 8:j]
+    if comp_string.isalnum():
         return GlycanComposition.from_string(comp_string)
+
+    # Malformed first tag: fall back to the full pattern, which skips
+    # ahead to a later well-formed occurrence if there is one
+    match = _PROFORMA_GLYCAN_RE.search(proforma_string)
+    if match:
+        return GlycanComposition.from_string(match.group(1))
     return None
 
 
+def parse_proforma_glycans(proforma_string: str) -> List[GlycanComposition]:
+    """
+    Parse every ProForma glycan annotation in a sequence string.
+
+    One pass of the compiled pattern instead of repeated single-glycan
+    searches when a peptidoform carries multiple glycans.
+    """
+    return [
+        GlycanComposition.from_string(match.group(1))
+        for match in _PROFORMA_GLYCAN_RE.finditer(proforma_string)
+    ]
+
+
 # =============================================================================
 # CROSSLINKER SUPPORT
 # =============================================================================
@@ -546,10 +892,11 @@ def parse_proforma_glycan(proforma_string: str) -> Optional[GlycanComposition]:
 # Reference: Schulte et al. Anal. Chem. 2025, 97, 23120-23130
 # =============================================================================
 
-@dataclass
+@dataclass(frozen=True)
 class Crosslinker:
     """
     Represents a chemical crosslinker for XL-MS experiments.
+    Immutable once constructed.
 
     Attributes:
         name: Crosslinker name
@@ -561,6 +908,9 @@ class Crosslinker:
         stub_masses: Dict of stub names to masses (for cleavable crosslinkers)
         diagnostic_ions: Dict of diagnostic ion names to m/z values
     """
+    __slots__ = ('name', 'formula', 'intact_mass', 'spacer_length',
+                 'cleavable', 'reactive_groups', 'stub_masses', 'diagnostic_ions')
+
     name: str
     formula: str
     intact_mass: float
@@ -652,12 +1002,12 @@ DSS = Crosslinker(
 )
 
 # Dictionary of all crosslinkers
-CROSSLINKERS = {
+CROSSLINKERS = MappingProxyType({
     'DSSO': DSSO,
     'DSBSO': DSBSO,
     'BS3': BS3,
     'DSS': DSS,
-}
+})
 
 
 # =============================================================================
@@ -702,38 +1052,38 @@ def generate_crosslink_fragments(
 
     if crosslinker.cleavable:
         # MS-cleavable crosslinker fragmentation
-        alkene = crosslinker.stub_masses.get('alkene', 0)
-        thiol = crosslinker.stub_masses.get('thiol', 0)
-        sulfenic = crosslinker.stub_masses.get('sulfenic', 0)
-
-        # Peptide 1 with different stubs
-        fragments['peptide1']['α-A'] = peptide1_mass + alkene  # Alkene stub
-        fragments['peptide1']['α-T'] = peptide1_mass + thiol   # Thiol stub
-        fragments['peptide1']['α-S'] = peptide1_mass + sulfenic  # Sulfenic stub
-
-        # Peptide 2 with different stubs
-        fragments['peptide2']['β-A'] = peptide2_mass + alkene
-        fragments['peptide2']['β-T'] = peptide2_mass + thiol
-        fragments['peptide2']['β-S'] = peptide2_mass + sulfenic
-
-        # Add charged versions
-        for charge in range(1, min(precursor_charge, 4)):
-            for name, mass in list(fragments['peptide1'].items()):
-                fragments['peptide1'][f'{name}+{charge}'] = (mass + charge * PROTON) / charge
-            for name, mass in list(fragments['peptide2'].items()):
-                fragments['peptide2'][f'{name}+{charge}'] = (mass + charge * PROTON) / charge
-
-        # Neutral losses
-        if include_neutral_losses:
-            for pep_key in ['peptide1', 'peptide2']:
-                for name, mass in list(fragments[pep_key].items()):
-                    if '+' not in name:  # Only for neutral masses
-                        fragments[pep_key][f'{name}-H2O'] = mass - H2O
-                        fragments[pep_key][f'{name}-NH3'] = mass - NH3
+        stub_labels = ('A', 'T', 'S')  # alkene / thiol / sulfenic
+        stub_masses = np.array([
+            crosslinker.stub_masses.get('alkene', 0),
+            crosslinker.stub_masses.get('thiol', 0),
+            crosslinker.stub_masses.get('sulfenic', 0),
+        ], dtype=np.float64)
+        charges = np.arange(1, min(precursor_charge, 4), dtype=np.float64)
+
+        for pep_key, prefix, pep_mass in (
+            ('peptide1', 'α', peptide1_mass),
+            ('peptide2', 'β', peptide2_mass),
+        ):
+            # Neutral stub masses, charged m/z grid, and neutral losses
+            # each come out of one vectorized expression
+            base = pep_mass + stub_masses
+            frag = {
+                f'{prefix}-{label}': float(mass)
+                for label, mass in zip(stub_labels, base)
+            }
+            mz_grid = (base[:, None] + charges[None, :] * PROTON) / charges[None, :]
+            for j, charge in enumerate(charges.astype(np.int64)):
+                for i, label in enumerate(stub_labels):
+                    frag[f'{prefix}-{label}+{charge}'] = float(mz_grid[i, j])
+            if include_neutral_losses:
+                losses = base[:, None] - np.array([H2O, NH3])[None, :]
+                for i, label in enumerate(stub_labels):
+                    frag[f'{prefix}-{label}-H2O'] = float(losses[i, 0])
+                    frag[f'{prefix}-{label}-NH3'] = float(losses[i, 1])
+            fragments[pep_key] = frag
 
         # Diagnostic ions
-        for ion_name, ion_mass in crosslinker.diagnostic_ions.items():
-            fragments['diagnostic'][ion_name] = ion_mass
+        fragments['diagnostic'].update(crosslinker.diagnostic_ions)
 
     else:
         # Non-cleavable crosslinker - intact crosslinked peptide
@@ -742,8 +1092,10 @@ def generate_crosslink_fragments(
         fragments['precursor']['intact'] = intact_mass
 
         # Charged precursors
-        for charge in range(1, precursor_charge + 1):
-            fragments['precursor'][f'intact+{charge}'] = (intact_mass + charge * PROTON) / charge
+        charges = np.arange(1, precursor_charge + 1, dtype=np.float64)
+        mz = (intact_mass + charges * PROTON) / charges
+        for charge, value in zip(charges.astype(np.int64), mz):
+            fragments['precursor'][f'intact+{charge}'] = float(value)
 
     return fragments
 
@@ -773,13 +1125,17 @@ def identify_crosslink_stubs(
     if not crosslinker.cleavable:
         return matches
 
+    # Sort the observed masses once and bisect the tolerance window per
+    # stub instead of scanning every peak for every stub
+    obs = np.sort(np.asarray(observed_masses, dtype=np.float64))
+
     for stub_name, stub_mass in crosslinker.stub_masses.items():
         expected = peptide_mass + stub_mass
+        lo = np.searchsorted(obs, expected - tolerance_da, side='left')
+        hi = np.searchsorted(obs, expected + tolerance_da, side='right')
 
-        for obs_mass in observed_masses:
-            error = abs(obs_mass - expected)
-            if error <= tolerance_da:
-                matches.append((stub_name, obs_mass, error))
+        for obs_mass in obs[lo:hi]:
+            matches.append((stub_name, float(obs_mass), abs(float(obs_mass) - expected)))
 
     return matches
 
@@ -824,6 +1180,10 @@ def calculate_crosslink_fmr(
 # PROFORMA CROSSLINK NOTATION
 # =============================================================================
 
+# ProForma 2.0 crosslink tag, compiled once at import
+_PROFORMA_XL_RE = re.compile(r'\[([A-Za-z0-9-]+)#XL\d+\]')
+
+
 def parse_proforma_crosslink(proforma_string: str) -> Optional[Tuple[str, str, str]]:
     """
     Parse ProForma 2.0 crosslink notation.
@@ -845,10 +1205,23 @@ def parse_proforma_crosslink(proforma_string: str) -> Optional[Tuple[str, str, s
 
     peptide1, peptide2 = parts
 
-    # Extract crosslinker name from first occurrence
-    xl_match = re.search(r'\[([A-Za-z0-9-]+)#XL\d+\]', peptide1)
-    if xl_match:
-        crosslinker_name = xl_match.group(1)
-        return (peptide1, peptide2, crosslinker_name)
+    # Fast path: scan for the '#XL' literal and walk back to '[', but
+    # only short-circuit on a well-formed [Name#XLn] tag; anything else
+    # falls through to the regex, as parse_proforma_glycan does
+    tag = peptide1.find('#XL')
+    if tag != -1:
+        start = peptide1.rfind('[', 0, tag)
+        if start != -1:
+            crosslinker_name = peptide1[start + 1:tag]
+            rest = peptide1[tag + 3:]
+            end = rest.find(']')
+            if (crosslinker_name
+                    and all(c.isalnum() or c == '-' for c in crosslinker_name)
+                    and end > 0 and rest[:end].isdigit()):
+                return (peptide1, peptide2, crosslinker_name)
+
+    match = _PROFORMA_XL_RE.search(peptide1)
+    if match:
+        return (peptide1, peptide2, match.group(1))
 
     return None
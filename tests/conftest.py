@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Shared pytest fixtures for the test suite.
+
+Expensive, input-constant setup (Y-ion enumeration, crosslink fragment
+generation) is computed once per session here instead of once per test.
+"""
+
+import numpy as np
+import pytest
+
+from spectrum_annotator_ddzby import (
+    generate_n_glycan_y_ions,
+    generate_crosslink_fragments,
+    identify_crosslink_stubs,
+    DSSO,
+    BS3,
+)
+
+
+@pytest.fixture(scope="session")
+def man5_y_ions():
+    """Y ion series for a Man5 N-glycan on a 1500 Da peptide."""
+    return generate_n_glycan_y_ions({'HexNAc': 2, 'Hex': 5}, 1500.0)
+
+
+@pytest.fixture(scope="session")
+def fucosylated_y_ions():
+    """Y ion series for a core-fucosylated N-glycan on a 1500 Da peptide."""
+    return generate_n_glycan_y_ions({'HexNAc': 2, 'Hex': 5, 'Fuc': 1}, 1500.0)
+
+
+@pytest.fixture(scope="session")
+def dsso_fragments():
+    """DSSO crosslink fragments for a 1000/1200 Da peptide pair at 4+."""
+    return generate_crosslink_fragments(1000.0, 1200.0, DSSO, precursor_charge=4)
+
+
+@pytest.fixture(scope="session")
+def bs3_fragments():
+    """BS3 (non-cleavable) fragments for a 1000/1200 Da peptide pair at 3+."""
+    return generate_crosslink_fragments(1000.0, 1200.0, BS3, precursor_charge=3)
+
+
+@pytest.fixture(scope="session")
+def dsso_stub_matches():
+    """Stub matches for a 1000 Da peptide with alkene/thiol peaks present.
+
+    The two stub peaks sit in a spectrum-sized array of background
+    peaks so the test exercises the vectorized path at production
+    scale, not a three-element list.
+    """
+    observed = np.concatenate([
+        np.array([
+            1000.0 + 54.01,  # Alkene stub
+            1000.0 + 85.98,  # Thiol stub
+            500.0,  # Random peak
+        ]),
+        np.random.default_rng(0).uniform(300.0, 3000.0, 10_000),
+    ])
+    return identify_crosslink_stubs(observed, 1000.0, DSSO, tolerance_da=0.05)
@@ -7,11 +7,10 @@ Run with: pytest tests/test_fragment_calculator.py -v
 
 import pytest
 import numpy as np
-import sys
-sys.path.insert(0, '..')
 
-from glycospectrum import (
+from spectrum_annotator_ddzby import (
     FragmentCalculator,
+    get_fragment_calculator,
     TheoreticalIon,
     parse_modifications_from_string,
     match_peaks,
@@ -111,6 +110,33 @@ class TestFragmentCalculator:
             assert ion.neutral_loss in ['H2O', 'NH3']
 
 
+class TestFragmentCalculatorFactory:
+    """Tests for the memoized get_fragment_calculator factory."""
+
+    def test_identical_args_hit_cache(self):
+        """Test identical (peptide, mods, charge) args return the cached instance."""
+        mods = parse_modifications_from_string("4S(528.2859)")
+        first = get_fragment_calculator("AGYSQGATQYTQAQQTR", mods, 3)
+        second = get_fragment_calculator("AGYSQGATQYTQAQQTR", mods, 3)
+        assert first is second
+
+    def test_equal_mod_dicts_hit_cache(self):
+        """Test separately parsed but equal modifications still share an instance."""
+        first = get_fragment_calculator(
+            "PEPTIDE", parse_modifications_from_string("4T(79.9663)"), 2)
+        second = get_fragment_calculator(
+            "PEPTIDE", parse_modifications_from_string("4T(79.9663)"), 2)
+        assert first is second
+
+    def test_differing_mods_miss_cache(self):
+        """Test differing modifications produce distinct calculators."""
+        unmodified = get_fragment_calculator("PEPTIDE", [], 2)
+        modified = get_fragment_calculator(
+            "PEPTIDE", parse_modifications_from_string("4T(79.9663)"), 2)
+        assert unmodified is not modified
+        assert abs(unmodified.precursor_mass - modified.precursor_mass) > 1.0
+
+
 class TestPeakMatching:
     """Tests for peak matching functionality."""
 
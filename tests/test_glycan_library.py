@@ -5,22 +5,27 @@ Tests for glycan_library module
 Run with: pytest tests/test_glycan_library.py -v
 """
 
+import numpy as np
 import pytest
-import sys
-sys.path.insert(0, '..')
+from types import MappingProxyType
 
 from spectrum_annotator_ddzby import (
     MONOSACCHARIDE_MASSES,
     OXONIUM_IONS_EXTENDED,
     OXONIUM_IONS_O_GLCNAC,
     OXONIUM_IONS_N_GLYCAN,
+    match_oxonium_ions,
     GlycanComposition,
     O_GLYCAN_COMPOSITIONS,
     N_GLYCAN_COMPOSITIONS,
     generate_y_ion_series,
     generate_n_glycan_y_ions,
+    generate_n_glycan_y_ions_batch,
     identify_glycan_from_mass,
+    identify_glycans_from_masses,
     get_glycan_mass,
+    parse_proforma_glycan,
+    parse_proforma_glycans,
     # Crosslinker support
     Crosslinker,
     CROSSLINKERS,
@@ -32,24 +37,27 @@ from spectrum_annotator_ddzby import (
 )
 
 
+@pytest.mark.fast
 class TestMonosaccharideMasses:
     """Tests for monosaccharide mass definitions."""
 
-    def test_hexnac_mass(self):
-        """Test HexNAc mass is correct."""
-        assert abs(MONOSACCHARIDE_MASSES['HexNAc'] - 203.0794) < 0.001
+    @pytest.mark.parametrize("name,expected", [
+        ('HexNAc', 203.0794),
+        ('Hex', 162.0528),
+        ('NeuAc', 291.0954),
+        ('Fuc', 146.0579),
+    ])
+    def test_monosaccharide_mass(self, name, expected):
+        """Test monosaccharide masses are correct."""
+        assert abs(MONOSACCHARIDE_MASSES[name] - expected) < 0.001
 
-    def test_hex_mass(self):
-        """Test Hex mass is correct."""
-        assert abs(MONOSACCHARIDE_MASSES['Hex'] - 162.0528) < 0.001
 
-    def test_neuac_mass(self):
-        """Test NeuAc mass is correct."""
-        assert abs(MONOSACCHARIDE_MASSES['NeuAc'] - 291.0954) < 0.001
-
-    def test_fuc_mass(self):
-        """Test Fuc mass is correct."""
-        assert abs(MONOSACCHARIDE_MASSES['Fuc'] - 146.0579) < 0.001
+# Reference masses for composition strings, folded once at module load
+_EXPECTED_MASSES = {
+    'HexNAc1': 203.0794,
+    'HexNAc2Hex3': 2 * 203.0794 + 3 * 162.0528,
+    'HexNAc2Hex5': 2 * 203.0794 + 5 * 162.0528,
+}
 
 
 class TestGlycanComposition:
@@ -59,20 +67,24 @@ class TestGlycanComposition:
         """Test parsing simple composition string."""
         glycan = GlycanComposition.from_string("HexNAc1")
         assert glycan.composition == {'HexNAc': 1}
-        assert abs(glycan.mass - 203.0794) < 0.01
+        assert abs(glycan.mass - _EXPECTED_MASSES['HexNAc1']) < 0.01
 
     def test_from_string_complex(self):
         """Test parsing complex composition string."""
         glycan = GlycanComposition.from_string("HexNAc2Hex5")
         assert glycan.composition == {'HexNAc': 2, 'Hex': 5}
-        expected_mass = 2 * 203.0794 + 5 * 162.0528
-        assert abs(glycan.mass - expected_mass) < 0.01
+        assert abs(glycan.mass - _EXPECTED_MASSES['HexNAc2Hex5']) < 0.01
 
     def test_from_string_with_sialic(self):
         """Test parsing composition with sialic acid."""
         glycan = GlycanComposition.from_string("HexNAc4Hex5NeuAc2")
         assert glycan.composition == {'HexNAc': 4, 'Hex': 5, 'NeuAc': 2}
 
+    def test_from_string_skips_junk_tokens(self):
+        """Test that separators, countless and unknown names are skipped."""
+        glycan = GlycanComposition.from_string("HexNAc2-Xyz3Hex5Fuc")
+        assert glycan.composition == {'HexNAc': 2, 'Hex': 5}
+
 
 class TestOxoniumIons:
     """Tests for oxonium ion definitions."""
@@ -92,6 +104,7 @@ class TestOxoniumIons:
         assert 'HexNAc-Hex' in OXONIUM_IONS_N_GLYCAN
 
 
+@pytest.mark.slow
 class TestYIonGeneration:
     """Tests for Y ion series generation."""
 
@@ -106,103 +119,151 @@ class TestYIonGeneration:
         assert 'Y1' in y_ions
         assert abs(y_ions['Y0'] - peptide_mass) < 0.01
 
-    def test_n_glycan_y_ions(self):
+    def test_n_glycan_y_ions(self, man5_y_ions):
         """Test Y ion generation for N-glycan."""
-        composition = {'HexNAc': 2, 'Hex': 5}
-        peptide_mass = 1500.0
-
-        y_ions = generate_n_glycan_y_ions(composition, peptide_mass)
-
-        assert 'Y0' in y_ions
-        assert 'Y1' in y_ions
-        assert 'Y2' in y_ions
-        assert 'Y(core)' in y_ions
+        assert 'Y0' in man5_y_ions
+        assert 'Y1' in man5_y_ions
+        assert 'Y2' in man5_y_ions
+        assert 'Y(core)' in man5_y_ions
 
-    def test_y_ions_include_fucose(self):
+    def test_y_ions_include_fucose(self, fucosylated_y_ions):
         """Test that fucosylated variants are generated."""
-        composition = {'HexNAc': 2, 'Hex': 5, 'Fuc': 1}
-        peptide_mass = 1500.0
-
-        y_ions = generate_n_glycan_y_ions(composition, peptide_mass)
-
-        # Should have fucosylated variants
-        fuc_variants = [k for k in y_ions.keys() if 'F' in k]
-        assert len(fuc_variants) > 0
+        # Should have fucosylated variants; any() stops at the first one
+        assert any('F' in k for k in fucosylated_y_ions)
 
 
+@pytest.mark.slow
 class TestGlycanIdentification:
     """Tests for glycan identification from mass."""
 
     def test_identify_o_glcnac(self):
         """Test identifying O-GlcNAc from mass."""
         matches = identify_glycan_from_mass(203.08, tolerance_da=0.1)
-        names = [m[0] for m in matches]
+        names = {m[0] for m in matches}
         assert 'O-GlcNAc' in names or 'O-GalNAc' in names
 
     def test_identify_n_glycan(self):
         """Test identifying N-glycan from mass."""
         # Man5 mass ~1216 Da
         matches = identify_glycan_from_mass(1216.42, tolerance_da=0.1)
-        names = [m[0] for m in matches]
+        names = {m[0] for m in matches}
         assert 'Man5' in names
 
 
+class TestBatchHelpers:
+    """Tests for the batch variants of the scalar library functions."""
+
+    def test_identify_batch_matches_scalar(self):
+        """Test batch identification equals a loop over the scalar function."""
+        masses = [203.08, 1216.42, 999.99]
+        batch = identify_glycans_from_masses(masses, tolerance_da=0.1)
+        assert len(batch) == len(masses)
+        for mass, matches in zip(masses, batch):
+            assert matches == identify_glycan_from_mass(mass, tolerance_da=0.1)
+
+    def test_identify_batch_empty(self):
+        """Test batch identification of an empty mass list."""
+        assert identify_glycans_from_masses([]) == []
+
+    def test_y_ion_batch_matches_scalar(self):
+        """Test batch Y ions equal a loop of the scalar generator."""
+        composition = {'HexNAc': 2, 'Hex': 5, 'Fuc': 1}
+        peptide_masses = [1000.0, 1500.0, 2345.6]
+        batch = generate_n_glycan_y_ions_batch(composition, peptide_masses)
+        for i, peptide_mass in enumerate(peptide_masses):
+            scalar = generate_n_glycan_y_ions(composition, peptide_mass)
+            assert set(batch) == set(scalar)
+            for name, mass in scalar.items():
+                assert abs(batch[name][i] - mass) < 1e-9
+
+    def test_y_ion_batch_empty(self):
+        """Test batch Y ions for an empty peptide mass list."""
+        batch = generate_n_glycan_y_ions_batch({'HexNAc': 2, 'Hex': 5}, [])
+        assert set(batch) == set(generate_n_glycan_y_ions({'HexNAc': 2, 'Hex': 5}, 1000.0))
+        assert all(len(masses) == 0 for masses in batch.values())
+
+    def test_match_oxonium_known_ions(self):
+        """Test each extended oxonium m/z matches itself within tolerance."""
+        peaks = np.array(list(OXONIUM_IONS_EXTENDED.values()))
+        matches = match_oxonium_ions(peaks, tolerance_da=0.01)
+        assert len(matches) == len(peaks)
+        for peak, match in zip(peaks, matches):
+            assert match is not None
+            name, theoretical_mz, error_da = match
+            assert abs(theoretical_mz - peak) < 0.01
+            assert abs(error_da) < 0.01
+
+    def test_match_oxonium_unmatched_and_empty(self):
+        """Test off-table peaks return None and empty input returns []."""
+        assert match_oxonium_ions([50.0, 1500.0]) == [None, None]
+        assert match_oxonium_ions([]) == []
+
+    def test_parse_proforma_glycans_matches_scalar(self):
+        """Test multi-glycan parsing agrees with the single-glycan parser."""
+        proforma = "PEPS[Glycan:HexNAc1]TN[Glycan:HexNAc2Hex5]K"
+        glycans = parse_proforma_glycans(proforma)
+        assert len(glycans) == 2
+        assert glycans[0] == parse_proforma_glycan(proforma)
+        assert glycans[1].composition == {'HexNAc': 2, 'Hex': 5}
+
+    def test_parse_proforma_glycans_none(self):
+        """Test a sequence without glycan annotations yields an empty list."""
+        assert parse_proforma_glycans("PEPTIDEK") == []
+
+
 class TestGetGlycanMass:
     """Tests for get_glycan_mass function."""
 
     def test_simple_composition(self):
         """Test mass calculation from composition string."""
         mass = get_glycan_mass("HexNAc1")
-        assert abs(mass - 203.0794) < 0.01
+        assert abs(mass - _EXPECTED_MASSES['HexNAc1']) < 0.01
 
     def test_complex_composition(self):
         """Test mass calculation for complex composition."""
         mass = get_glycan_mass("HexNAc2Hex3")
-        expected = 2 * 203.0794 + 3 * 162.0528
-        assert abs(mass - expected) < 0.01
+        assert abs(mass - _EXPECTED_MASSES['HexNAc2Hex3']) < 0.01
+
+
+# Hashed view of every O-glycan composition: membership checks become a
+# single set lookup instead of a dict-equality scan over the library
+_O_GLYCAN_COMPOSITION_SET = frozenset(
+    frozenset(glycan.composition.items())
+    for glycan in O_GLYCAN_COMPOSITIONS.values()
+)
 
 
 class TestExpandedOGlycans:
     """Tests for expanded O-glycan database (MSFragger 12 common structures)."""
 
-    def test_all_12_msfragger_glycans_present(self):
-        """Test that all 12 MSFragger O-glycans are defined."""
-        # MSFragger glycan compositions
-        expected_compositions = [
-            {'HexNAc': 1},  # 1
-            {'HexNAc': 1, 'Hex': 1},  # 2
-            {'HexNAc': 1, 'NeuAc': 1},  # 3
-            {'HexNAc': 2, 'Hex': 1},  # 4
-            {'HexNAc': 1, 'Hex': 1, 'NeuAc': 1},  # 5
-            {'HexNAc': 2, 'Hex': 2},  # 6
-            {'HexNAc': 2, 'Hex': 1, 'NeuAc': 1},  # 7
-            {'HexNAc': 1, 'Hex': 1, 'NeuAc': 2},  # 8
-            {'HexNAc': 2, 'Hex': 2, 'NeuAc': 1},  # 9
-            {'HexNAc': 2, 'Hex': 2, 'Fuc': 1, 'NeuAc': 1},  # 10
-            {'HexNAc': 2, 'Hex': 2, 'NeuAc': 2},  # 11
-            {'HexNAc': 2, 'Hex': 2, 'Fuc': 1, 'NeuAc': 2},  # 12
-        ]
-
-        for expected_comp in expected_compositions:
-            found = False
-            for glycan in O_GLYCAN_COMPOSITIONS.values():
-                if glycan.composition == expected_comp:
-                    found = True
-                    break
-            assert found, f"Missing O-glycan composition: {expected_comp}"
-
-    def test_sialyl_tn_mass(self):
-        """Test Sialyl-Tn (HexNAc1NeuAc1) mass."""
-        glycan = O_GLYCAN_COMPOSITIONS['Sialyl-Tn']
-        expected = MONOSACCHARIDE_MASSES['HexNAc'] + MONOSACCHARIDE_MASSES['NeuAc']
-        assert abs(glycan.mass - expected) < 0.01
-
-    def test_disialyl_t_mass(self):
-        """Test Disialyl-T (HexNAc1Hex1NeuAc2) mass."""
-        glycan = O_GLYCAN_COMPOSITIONS['Disialyl-T']
-        expected = (MONOSACCHARIDE_MASSES['HexNAc'] +
-                   MONOSACCHARIDE_MASSES['Hex'] +
-                   2 * MONOSACCHARIDE_MASSES['NeuAc'])
+    # MSFragger glycan compositions
+    @pytest.mark.parametrize("expected_comp", [
+        {'HexNAc': 1},  # 1
+        {'HexNAc': 1, 'Hex': 1},  # 2
+        {'HexNAc': 1, 'NeuAc': 1},  # 3
+        {'HexNAc': 2, 'Hex': 1},  # 4
+        {'HexNAc': 1, 'Hex': 1, 'NeuAc': 1},  # 5
+        {'HexNAc': 2, 'Hex': 2},  # 6
+        {'HexNAc': 2, 'Hex': 1, 'NeuAc': 1},  # 7
+        {'HexNAc': 1, 'Hex': 1, 'NeuAc': 2},  # 8
+        {'HexNAc': 2, 'Hex': 2, 'NeuAc': 1},  # 9
+        {'HexNAc': 2, 'Hex': 2, 'Fuc': 1, 'NeuAc': 1},  # 10
+        {'HexNAc': 2, 'Hex': 2, 'NeuAc': 2},  # 11
+        {'HexNAc': 2, 'Hex': 2, 'Fuc': 1, 'NeuAc': 2},  # 12
+    ])
+    def test_msfragger_glycan_present(self, expected_comp):
+        """Test that each of the 12 MSFragger O-glycans is defined."""
+        assert frozenset(expected_comp.items()) in _O_GLYCAN_COMPOSITION_SET, \
+            f"Missing O-glycan composition: {expected_comp}"
+
+    @pytest.mark.parametrize("name,composition", [
+        ('Sialyl-Tn', {'HexNAc': 1, 'NeuAc': 1}),
+        ('Disialyl-T', {'HexNAc': 1, 'Hex': 1, 'NeuAc': 2}),
+    ])
+    def test_o_glycan_mass(self, name, composition):
+        """Test O-glycan masses match their compositions."""
+        glycan = O_GLYCAN_COMPOSITIONS[name]
+        expected = sum(MONOSACCHARIDE_MASSES[m] * c for m, c in composition.items())
         assert abs(glycan.mass - expected) < 0.01
 
     def test_core_structures_present(self):
@@ -228,30 +289,29 @@ class TestExpandedOGlycans:
 class TestCrosslinkers:
     """Tests for crosslinker support."""
 
-    def test_crosslinker_definitions(self):
-        """Test that main crosslinkers are defined."""
-        assert 'DSSO' in CROSSLINKERS
-        assert 'DSBSO' in CROSSLINKERS
-        assert 'BS3' in CROSSLINKERS
+    @pytest.mark.parametrize("name,crosslinker,cleavable,has_stubs", [
+        ('DSSO', DSSO, True, True),
+        ('DSBSO', DSBSO, True, True),
+        ('BS3', BS3, False, False),
+    ])
+    def test_crosslinker_properties(self, name, crosslinker, cleavable, has_stubs):
+        """Test shared crosslinker invariants across the library."""
+        assert name in CROSSLINKERS
+        assert crosslinker.cleavable == cleavable
+        assert crosslinker.reactive_groups == 'NHS'
+        assert bool(crosslinker.stub_masses) == has_stubs
+
+    def test_registries_read_only(self):
+        """Test that the shared library registries are read-only proxies."""
+        for registry in (CROSSLINKERS, O_GLYCAN_COMPOSITIONS, MONOSACCHARIDE_MASSES):
+            assert isinstance(registry, MappingProxyType)
 
     def test_dsso_properties(self):
         """Test DSSO crosslinker properties."""
-        assert DSSO.cleavable == True
         assert 'alkene' in DSSO.stub_masses
         assert 'thiol' in DSSO.stub_masses
         assert abs(DSSO.stub_masses['alkene'] - 54.0106) < 0.001
 
-    def test_dsbso_properties(self):
-        """Test DSBSO crosslinker properties."""
-        assert DSBSO.cleavable == True
-        assert DSBSO.reactive_groups == 'NHS'
-        assert len(DSBSO.stub_masses) > 0
-
-    def test_bs3_non_cleavable(self):
-        """Test BS3 is non-cleavable."""
-        assert BS3.cleavable == False
-        assert len(BS3.stub_masses) == 0
-
     def test_stub_mass_difference(self):
         """Test A-T mass difference is ~32 Da (sulfur)."""
         alkene = DSSO.stub_masses['alkene']
@@ -263,48 +323,22 @@ class TestCrosslinkers:
 class TestCrosslinkFragments:
     """Tests for crosslink fragment generation."""
 
-    def test_generate_dsso_fragments(self):
+    def test_generate_dsso_fragments(self, dsso_fragments):
         """Test DSSO fragment generation."""
-        pep1_mass = 1000.0
-        pep2_mass = 1200.0
-
-        fragments = generate_crosslink_fragments(
-            pep1_mass, pep2_mass, DSSO, precursor_charge=4
-        )
-
-        assert 'peptide1' in fragments
-        assert 'peptide2' in fragments
-        assert 'α-A' in fragments['peptide1']
-        assert 'β-T' in fragments['peptide2']
+        assert 'peptide1' in dsso_fragments
+        assert 'peptide2' in dsso_fragments
+        assert 'α-A' in dsso_fragments['peptide1']
+        assert 'β-T' in dsso_fragments['peptide2']
 
-    def test_non_cleavable_fragments(self):
+    def test_non_cleavable_fragments(self, bs3_fragments):
         """Test BS3 (non-cleavable) fragment generation."""
-        pep1_mass = 1000.0
-        pep2_mass = 1200.0
+        assert 'precursor' in bs3_fragments
+        assert 'intact' in bs3_fragments['precursor']
 
-        fragments = generate_crosslink_fragments(
-            pep1_mass, pep2_mass, BS3, precursor_charge=3
-        )
-
-        assert 'precursor' in fragments
-        assert 'intact' in fragments['precursor']
-
-    def test_identify_stubs(self):
+    def test_identify_stubs(self, dsso_stub_matches):
         """Test stub identification from masses."""
-        peptide_mass = 1000.0
-        # Simulate observed masses with alkene and thiol stubs
-        observed = [
-            1000.0 + 54.01,  # Alkene stub
-            1000.0 + 85.98,  # Thiol stub
-            500.0,  # Random peak
-        ]
-
-        matches = identify_crosslink_stubs(
-            observed, peptide_mass, DSSO, tolerance_da=0.05
-        )
-
-        assert len(matches) >= 2
-        stub_names = [m[0] for m in matches]
+        assert len(dsso_stub_matches) >= 2
+        stub_names = {m[0] for m in dsso_stub_matches}
         assert 'alkene' in stub_names
         assert 'thiol' in stub_names
 